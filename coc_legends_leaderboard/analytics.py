@@ -0,0 +1,238 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+from rollups import LEGEND_DAY_OFFSET, load_series, snapshots_to_bars
+
+
+logging.basicConfig(level=logging.INFO)
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_history(dbname, season):
+    ''' Load the trophy history of a season from database.
+
+    The history is loaded as bars, see ``rollups.load_series``: single snapshot bars for the
+    recent snapshots, and the hourly and daily bars the older snapshots were rolled up into.
+
+    Parameters
+    ----------
+    dbname : str
+        The database file name.
+    season : str
+        The season, e.g. '2021-03'.
+
+    Returns
+    -------
+    history : pandas.DataFrame
+        A Pandas DataFrame of the bars of the season.
+    '''
+    return load_series(dbname, season, resolution='raw')
+
+
+def compute_player_stats(history, remaining_days=0):
+    '''
+    Compute per-player statistics over the trophy history of the whole roster.
+
+    All the statistics are computed with vectorized group-bys, there is no loop over players.
+    The statistics are the same whether the history is made of raw snapshots or of the bars
+    they were rolled up into.
+
+    Parameters
+    ----------
+    history        : pandas.DataFrame
+        A Pandas DataFrame of bars from ``load_history``, or of leaderboard snapshots with at
+        least the columns ``player_tag``, ``name``, ``trophies`` and ``timestamp``.
+    remaining_days : float, optional, default to 0
+        Number of legend days left in the season, used to project the finish.
+
+    Returns
+    -------
+    stats : pandas.DataFrame
+        A Pandas DataFrame indexed by player tag, with columns:
+
+        * ``name``, ``trophies``: the latest name and trophy count.
+        * ``avg_daily_gain``: average net trophy change per legend day.
+        * ``gain_share``: share of the trophies won among the trophies won and lost. This is not
+          an attack win rate, as a snapshot can merge several attacks and defenses.
+        * ``best_day``, ``best_day_gain``, ``worst_day``, ``worst_day_gain``: the legend day with
+          the highest and lowest net trophy change.
+        * ``consistency``: standard deviation of the daily trophy change, lower is steadier.
+        * ``projected_finish``: projected trophy count at the end of the season.
+
+        Sorted by trophies.
+    '''
+    columns = ['name', 'trophies', 'avg_daily_gain', 'gain_share', 'best_day', 'best_day_gain',
+               'worst_day', 'worst_day_gain', 'consistency', 'projected_finish']
+    if len(history) == 0:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='player_tag'))
+
+    if 'bucket' not in history.columns:
+        history = snapshots_to_bars(history)
+    history = history.assign(bucket=pd.to_datetime(history['bucket'])) \
+        .sort_values(by=['player_tag', 'bucket'], kind='stable')
+    history = history.assign(legend_day=(history['bucket'] - LEGEND_DAY_OFFSET).dt.floor('D'))
+    by_player = history.groupby('player_tag', sort=False)
+
+    # trophy changes between consecutive snapshots, counted within the bars
+    changes = by_player[['gains', 'losses']].sum()
+    gain_share = changes['gains'] / (changes['gains'] + changes['losses']).replace(0, np.nan)
+
+    # net trophy change per legend day, the first day is measured from the first snapshot
+    daily = history.groupby(['player_tag', 'legend_day'], sort=True).agg(
+        first=('open', 'first'), last=('close', 'last'))
+    daily['gain'] = daily.groupby(level='player_tag')['last'].diff()
+    daily['gain'] = daily['gain'].fillna(daily['last'] - daily['first'])
+    daily = daily.reset_index()
+    by_day = daily.groupby('player_tag')['gain']
+    extremes = daily.sort_values(by='gain', kind='stable').groupby('player_tag').agg(
+        worst_day=('legend_day', 'first'),
+        worst_day_gain=('gain', 'first'),
+        best_day=('legend_day', 'last'),
+        best_day_gain=('gain', 'last'),
+    )
+
+    stats = by_player[['name', 'close']].last().rename(columns={'close': 'trophies'})
+    stats['avg_daily_gain'] = by_day.mean()
+    stats['gain_share'] = gain_share
+    stats = stats.join(extremes)
+    stats['consistency'] = by_day.std(ddof=0)
+    stats = project_finish(stats, remaining_days)
+    return stats[columns].sort_values(by='trophies', ascending=False)
+
+
+def project_finish(stats, remaining_days):
+    ''' Set the ``projected_finish`` of the player statistics from their average daily gain.
+
+    Parameters
+    ----------
+    stats          : pandas.DataFrame
+        The player statistics, see ``compute_player_stats``.
+    remaining_days : float
+        Number of legend days left in the season.
+
+    Returns
+    -------
+    stats : pandas.DataFrame
+        A copy of the statistics with the projection.
+    '''
+    return stats.assign(projected_finish=(stats['trophies'] + stats['avg_daily_gain'] * remaining_days).round())
+
+
+class PlayerStatsCache:
+    '''
+    Cache of the player statistics of a season.
+
+    The statistics are computed on first request and kept until the cache is invalidated,
+    which should happen every time the leaderboard is refreshed. The finish is projected on
+    every request, as the remaining days change in between.
+
+    Parameters
+    ----------
+    dbname : str
+        The database file name.
+    '''
+
+    def __init__(self, dbname):
+        self.dbname = dbname
+        self._stats = {}
+
+    def invalidate(self):
+        ''' Drop all the cached statistics.
+        '''
+        self._stats.clear()
+
+    def get(self, season, remaining_days=0):
+        ''' Get the player statistics of a season.
+
+        Parameters
+        ----------
+        season         : str
+            The season, e.g. '2021-03'.
+        remaining_days : float, optional, default to 0
+            Number of legend days left in the season, used to project the finish.
+
+        Returns
+        -------
+        stats : pandas.DataFrame
+            See ``compute_player_stats``.
+        '''
+        if season not in self._stats:
+            logging.info('Computing player statistics for season {}.'.format(season))
+            history = load_history(self.dbname, season)
+            self._stats[season] = compute_player_stats(history)
+        return project_finish(self._stats[season], remaining_days)
+
+
+def format_player_stats(stats, player_tag, season):
+    '''
+    Format the statistics of a player into text for discord post.
+
+    Parameters
+    ----------
+    stats      : pandas.DataFrame
+        The player statistics, see ``compute_player_stats``.
+    player_tag : str, starts with '#'
+        The player tag '#...'.
+    season     : str
+        The season of the statistics.
+
+    Returns
+    -------
+    content : str or None
+        The formatted text, None if the player has no statistics.
+    '''
+    if player_tag not in stats.index:
+        return None
+    player = stats.loc[player_tag]
+    content = [
+        '{} ({}) - {} Season'.format(player['name'], player_tag, season),
+        '-' * 40,
+        '{:<20s} {:>8}'.format('Trophies', int(player['trophies'])),
+        '{:<20s} {:>+8.1f}'.format('Avg. daily gain', player['avg_daily_gain']),
+        '{:<20s} {:>8s}'.format('Gain share', '-' if pd.isna(player['gain_share'])
+                                else '{:.0%}'.format(player['gain_share'])),
+        '{:<20s} {:>+8.0f} ({:%m-%d})'.format('Best day', player['best_day_gain'], player['best_day']),
+        '{:<20s} {:>+8.0f} ({:%m-%d})'.format('Worst day', player['worst_day_gain'], player['worst_day']),
+        '{:<20s} {:>8.1f}'.format('Consistency (std)', player['consistency']),
+        '{:<20s} {:>8.0f}'.format('Projected finish', player['projected_finish']),
+    ]
+    return '```\n{}\n```'.format('\n'.join(content))
+
+
+def format_season_report(stats, season, max_lines=None, name_pading=15):
+    '''
+    Format the statistics of all players into a season report for discord post.
+
+    Parameters
+    ----------
+    stats       : pandas.DataFrame
+        The player statistics, see ``compute_player_stats``.
+    season      : str
+        The season of the statistics.
+    max_lines   : int, optional, default to None
+        If not None, only show the top ``max_lines`` players.
+    name_pading : int, optional, default to 15
+        The width of the name column.
+    '''
+    if max_lines is not None:
+        stats = stats.iloc[:max_lines]
+    header = '{:<{pad}s} {:>5} {:>6} {:>5} {:>6}'.format(
+        'Name', '🏆', 'Avg', 'Gain', 'Proj', pad=name_pading)
+    content = [
+        'Season Report for {} Season'.format(season),
+        '-' * len(header),
+        header,
+    ]
+    for _, player in stats.iterrows():
+        content.append('{:<{pad}.{pad}s} {:>5} {:>+6.1f} {:>5s} {:>6.0f}'.format(
+            player['name'],
+            int(player['trophies']),
+            player['avg_daily_gain'],
+            '-' if pd.isna(player['gain_share']) else '{:.0%}'.format(player['gain_share']),
+            player['projected_finish'],
+            pad=name_pading,
+        ))
+    content.append('-' * len(header))
+    return '```\n{}\n```'.format('\n'.join(content))
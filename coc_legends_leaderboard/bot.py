@@ -1,20 +1,43 @@
 import os
+import re
 import math
+import time
 import random
+import asyncio
+import datetime
+import functools
+import collections
 import logging
 import textwrap
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from dotenv import load_dotenv
 
 from legends_leaderboard import (
     LegendsLeagueLeaderboard,
     format_leaderboard,
     format_leaderboard_title,
+    empty_leaderboard,
     load_leaderboard,
     save_leaderboard,
+    subscribe_leaderboard,
     )
+import directory
+from snapshot import load_snapshot
+import tracing
+from analytics import (
+    PlayerStatsCache,
+    format_player_stats,
+    format_season_report,
+    )
+from scheduler import AdaptivePollScheduler
+from war_tracker import WarTracker
+from cwl import format_cwl_summary, summarize_cwl
+from discord_queue import MessageUpdateQueue
+from clan_watch import ClanWatcher
+from rollups import compact_history, load_latest_board
+from rank_diff import RankTracker
 
 PATH = os.path.dirname(os.path.abspath(__file__))
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +47,18 @@ load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 GUILD = os.getenv('DISCORD_GUILD')
 COC_API_TOKEN = os.getenv("COC_TOLEN")
+POLL_BUDGET_PER_MINUTE = int(os.getenv("POLL_BUDGET_PER_MINUTE", "0"))
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "0"))
+PLAYER_SNAPSHOTS = os.getenv("PLAYER_SNAPSHOTS", "0") == "1"
+WAR_CHANNEL_ID = int(os.getenv("WAR_CHANNEL_ID", "0"))
+ANNOUNCE_CHANNEL_ID = int(os.getenv("ANNOUNCE_CHANNEL_ID", "0"))
+CLAN_WATCH_MINUTES = int(os.getenv("CLAN_WATCH_MINUTES", "0"))
+HISTORY_COMPACTION_HOURS = int(os.getenv("HISTORY_COMPACTION_HOURS", "1"))
+HISTORY_RAW_RETENTION_HOURS = int(os.getenv("HISTORY_RAW_RETENTION_HOURS", "0"))
+HISTORY_HOURLY_RETENTION_DAYS = int(os.getenv("HISTORY_HOURLY_RETENTION_DAYS", "7"))
+HTTP_CACHE_RETENTION_HOURS = int(os.getenv("HTTP_CACHE_RETENTION_HOURS", "24"))
+CLAN_WATCH_REMOVE_LEAVERS = os.getenv("CLAN_WATCH_REMOVE_LEAVERS", "0") == "1"
+tracing.slow_threshold = float(os.getenv("SLOW_TRACE_SECONDS", "2"))
 
 
 # bot command prefix
@@ -34,17 +69,217 @@ bot = commands.Bot(command_prefix='!')
 lll = LegendsLeagueLeaderboard(
     filename=os.path.join(PATH, 'list_of_tags.txt'),
     api_token=COC_API_TOKEN,
+    refresh_workers=REFRESH_WORKERS,
+    player_snapshots=PLAYER_SNAPSHOTS,
 )
 
-max_lines = 10
-global page_no
-page_no = 0
-lll.load_player_tags()
+stats_cache = PlayerStatsCache(lll.dbname)
+scheduler = AdaptivePollScheduler(budget_per_minute=POLL_BUDGET_PER_MINUTE)
+war_tracker = WarTracker(lll.coc)
+update_queue = MessageUpdateQueue()
+clan_watcher = ClanWatcher(lll.coc)
+profiler = tracing.CommandProfiler()
+rank_tracker = RankTracker()
 
+max_lines = 10
+max_live_messages = 20
+# reactions that flip the pages of a leaderboard message
+page_emojis = '⏮ ⏪ ⏩ ⏭ 🔄'.split()
+# live leaderboard messages, message id -> [message, page number, whether to show global ranks]
+live_messages = collections.OrderedDict()
+# rendered pages of the current leaderboard, (page number, global ranks, minute) -> content
+page_cache = {}
+# rank changes of the last refresh, shown as ▲/▼ next to the players
+last_changes = None
+
+# loaded by warm_up, commands wait until it is done
 global current_leaderboard
 global season
-current_leaderboard, season = load_leaderboard(lll.dbname)
-#  current_leaderboard = lll.get_current_season_trophies()
+current_leaderboard, season = None, None
+# (season, leaderboard) last saved for the current season, the base of the scheduled polls,
+# as the shown leaderboard can be the last season one
+polled_board = (None, None)
+warmed_up = asyncio.Event()
+
+
+def load_state():
+    ''' Load the roster and the last leaderboard, preferring the binary snapshot.
+
+    A missing or corrupt database results in an empty leaderboard instead of a crash.
+    '''
+    lll.load_player_tags()
+    lll.load_qualified_clans()
+    lll.load_flagged_players()
+    lll.load_linked_accounts()
+    snapshot = load_snapshot(lll.dbname)
+    if snapshot is None:
+        try:
+            snapshot = load_leaderboard(lll.dbname)
+        except Exception as error:
+            logging.warning('Failed to load leaderboard from database: {}'.format(error))
+            snapshot = (empty_leaderboard(), lll.current_season)
+    return snapshot
+
+
+async def warm_up():
+    ''' Load the state of the bot without blocking the event loop.
+    '''
+    global current_leaderboard
+    global season
+    global polled_board
+    start = time.perf_counter()
+    loop = asyncio.get_event_loop()
+    data, loaded_season = empty_leaderboard(), lll.current_season
+    try:
+        data, loaded_season = await loop.run_in_executor(None, load_state)
+        if (polled_board[0] is None) and (loaded_season == lll.current_season):
+            polled_board = (loaded_season, data)
+    except Exception:
+        logging.exception('Failed to load the state, starting from an empty leaderboard.')
+    finally:
+        if current_leaderboard is None:
+            # a refresh may have finished in the meantime
+            current_leaderboard, season = data, loaded_season
+        if len(rank_tracker) == 0:
+            reset_rank_tracker(current_leaderboard)
+        # the commands would wait forever otherwise
+        warmed_up.set()
+    logging.info('Warmed up in {:.3f}s.'.format(time.perf_counter() - start))
+
+
+@bot.before_invoke
+async def before_command(ctx):
+    ''' Wait for the warm up, then trace and maybe profile the command.
+    '''
+    await warmed_up.wait()
+    ctx.trace_token = tracing.start_span('command.{}'.format(ctx.command.name))
+    profiler.start(ctx)
+
+
+@bot.after_invoke
+async def after_command(ctx):
+    profiler.stop(ctx, ctx.command.name)
+    if getattr(ctx, 'trace_token', None) is not None:
+        tracing.end_span(ctx.trace_token)
+
+
+def get_page_max():
+    return max(math.ceil(len(current_leaderboard) / max_lines), 1)
+
+
+def render_page(page_no, global_rank=False):
+    ''' Render a page of the current leaderboard, shared by all the live messages.
+    '''
+    # the refresh time and the countdown are shown in minutes
+    minute = int(time.time() // 60)
+    key = (page_no, global_rank, minute)
+    if key not in page_cache:
+        for cached_key in [cached_key for cached_key in page_cache if cached_key[2] != minute]:
+            del page_cache[cached_key]
+        data = current_leaderboard
+        if global_rank:
+            data = lll.join_ranks(data, season_id=None if season == lll.current_season else season)
+        page_cache[key] = format_leaderboard(
+            data=data,
+            title=format_leaderboard_title(season=season),
+            page_no=page_no,
+            max_lines=max_lines,
+            center=1,
+            season_countdown=lll.get_countdown_current_season() if season == lll.current_season else None,
+            changes=last_changes,
+        )
+    return page_cache[key]
+
+
+def is_leaderboard_page(content):
+    ''' Whether a message is a page rendered by ``render_page``, from its title.
+    '''
+    lines = content.split('\n')
+    title = re.escape(format_leaderboard_title(season='SEASON')).replace('SEASON', r'\S+')
+    return (len(lines) > 1) and (lines[0] == '```') and (re.fullmatch(title, lines[1].strip()) is not None)
+
+
+def register_live_message(message, page_no=0, global_rank=False):
+    ''' Keep track of a leaderboard message, so it is updated after every refresh.
+    '''
+    live_messages[message.id] = [message, page_no, global_rank]
+    live_messages.move_to_end(message.id)
+    while len(live_messages) > max_live_messages:
+        live_messages.popitem(last=False)
+
+
+def reset_rank_tracker(data):
+    ''' Start tracking the rank changes from a leaderboard.
+    '''
+    rank_tracker.reset(
+        dict(zip(data['player_tag'], data['trophies'])),
+        dict(zip(data['player_tag'], data['name'])))
+
+
+def announce_rank_changes(changes):
+    ''' Post the new #1 and the passes into the announcements channel.
+    '''
+    if not ANNOUNCE_CHANNEL_ID:
+        return
+    lines = changes.format_announcements()
+    channel = bot.get_channel(ANNOUNCE_CHANNEL_ID)
+    if lines and channel is not None:
+        asyncio.ensure_future(channel.send('\n'.join(lines)))
+
+
+@subscribe_leaderboard
+def on_leaderboard_saved(data, new_season):
+    ''' Re-render all the live leaderboard messages once the leaderboard is saved.
+    '''
+    global current_leaderboard
+    global season
+    global last_changes
+    global polled_board
+    if new_season == lll.current_season:
+        polled_board = (new_season, data)
+    if (new_season != season) or (len(rank_tracker) == 0):
+        reset_rank_tracker(data)
+        last_changes = None
+    else:
+        last_changes = rank_tracker.diff(data)
+        announce_rank_changes(last_changes)
+    current_leaderboard, season = data, new_season
+    page_cache.clear()
+    stats_cache.invalidate()
+    page_max = get_page_max()
+    for entry in live_messages.values():
+        message, page_no, global_rank = entry
+        entry[1] = min(page_no, page_max - 1)
+        update_queue.edit(message, render_page(entry[1], global_rank))
+
+
+def parse_listing_args(args):
+    ''' Parse the page number (starting from 1) and the ``-c <clan tag>`` filter of a listing command.
+    '''
+    page_no = 0
+    clan_tag = None
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in ('-c', '--clan') and args:
+            clan_tag = args.pop(0).upper()
+        elif arg.isdigit():
+            page_no = max(int(arg) - 1, 0)
+    return page_no, clan_tag
+
+
+def format_listing(title, lines, page_no, page_size=20):
+    ''' Format a page of a listing read from the directory.
+    '''
+    total_pages = max(math.ceil(len(lines) / page_size), 1)
+    page_no = min(page_no, total_pages - 1)
+    return textwrap.dedent("""\
+        {} (page {}/{}):
+        ```
+        {}
+        ```
+    """).format(title, page_no + 1, total_pages,
+                "\n".join(lines[page_no * page_size: (page_no + 1) * page_size]) or "None")
 
 
 def check_adimin_perm(ctx):
@@ -67,6 +302,83 @@ async def on_ready():
         f'{guild.name}(id: {guild.id})'
     )
 
+    update_queue.start()
+    if POLL_BUDGET_PER_MINUTE > 0 and not scheduled_refresh.is_running():
+        scheduled_refresh.start()
+    if WAR_CHANNEL_ID and not war_updates.is_running():
+        war_updates.start()
+    if CLAN_WATCH_MINUTES > 0 and not clan_watch.is_running():
+        clan_watch.change_interval(minutes=CLAN_WATCH_MINUTES)
+        clan_watch.start()
+    if HISTORY_COMPACTION_HOURS > 0 and not history_compaction.is_running():
+        history_compaction.change_interval(hours=HISTORY_COMPACTION_HOURS)
+        history_compaction.start()
+
+
+# refresh the leaderboard in the background
+@tasks.loop(minutes=1)
+async def scheduled_refresh():
+    ''' Poll the players that are due and update the leaderboard.
+    '''
+    await warmed_up.wait()
+    board_season, data = polled_board
+    if board_season != lll.current_season:
+        # the shown leaderboard is not the current season one, e.g. after a `!rankings -l`:
+        # rebuild it from the history, which is empty on a new season
+        loop = asyncio.get_event_loop()
+        data = await loop.run_in_executor(
+            None, load_latest_board, lll.dbname, lll.current_season, list(lll.player_tags))
+    data, polled = await lll.poll_scheduled_trophies(scheduler, data)
+    if len(polled) > 0:
+        logging.info('Polled {} players.'.format(len(polled)))
+        save_leaderboard(lll.dbname, data, lll.current_season, history=polled)
+
+
+# sync the roster with the members of the qualified clans
+@tasks.loop(minutes=10)
+async def clan_watch():
+    ''' Register players who joined the qualified clans and flag or remove those who left.
+    '''
+    await warmed_up.wait()
+    if not lll.qualified_clans:
+        return
+    joined, left = await clan_watcher.poll(lll.qualified_clans)
+    if joined or left:
+        lll.apply_roster_changes(joined, left, remove_leavers=CLAN_WATCH_REMOVE_LEAVERS)
+
+
+# roll the leaderboard history up into hourly and daily bars
+@tasks.loop(hours=1)
+async def history_compaction():
+    ''' Roll up and prune the old leaderboard history.
+    '''
+    await warmed_up.wait()
+    raw_retention = datetime.timedelta(hours=HISTORY_RAW_RETENTION_HOURS) if HISTORY_RAW_RETENTION_HOURS else None
+    loop = asyncio.get_event_loop()
+    compacted = await loop.run_in_executor(None, functools.partial(
+        compact_history, lll.dbname, raw_retention=raw_retention,
+        hourly_retention=datetime.timedelta(days=HISTORY_HOURLY_RETENTION_DAYS)))
+    if compacted['raw'] or compacted['hourly']:
+        stats_cache.invalidate()
+    if getattr(lll.coc, 'http_cache', None) is not None:
+        # drop the responses that expired long ago, with the pending writes of the other tasks
+        await lll.flush_http_cache()
+        await loop.run_in_executor(None, lll.coc.http_cache.purge, HTTP_CACHE_RETENTION_HOURS * 3600)
+
+
+# post new war attacks of the qualified clans
+@tasks.loop(minutes=2)
+async def war_updates():
+    ''' Post the new attacks in the current wars of the qualified clans.
+    '''
+    await warmed_up.wait()
+    channel = bot.get_channel(WAR_CHANNEL_ID)
+    if channel is None:
+        logging.warning('War channel {} not found.'.format(WAR_CHANNEL_ID))
+        return
+    for update in await war_tracker.poll(lll.qualified_clans):
+        await channel.send(update.format())
+
 
 # test command
 @bot.command(name='test')
@@ -94,38 +406,34 @@ async def rankings(ctx, *args):
     if ('-h' in args) or ('--help' in args):
         await ctx.send(textwrap.dedent('''\
             ```
-            Usage !rankings [-h|--help] [-r|--refresh] [-l|--last-season]
+            Usage !rankings [-h|--help] [-r|--refresh] [-l|--last-season] [-g|--global-rank]
 
               -h, --help          show this help message.
               -r, --refresh       refresh the leaderboard before show ranking.
               -l, --last-season   load last season's end-of-season leaderboard.
+              -g, --global-rank   show the global legend rank of the players.
             ```
         '''))
         return
     elif ('-r' in args) or ('--refresh' in args):
         logging.info('Refreshing leaderboard.')
-        current_leaderboard = await lll.get_current_season_trophies()
-        season = lll.current_season
-        save_leaderboard(lll.dbname, current_leaderboard, season)
+        save_leaderboard(lll.dbname, await lll.get_current_season_trophies(), lll.current_season)
     elif ('-l' in args) or ('--last-season' in args):
         logging.info('Refreshing leaderboard.')
-        current_leaderboard = await lll.get_last_season_trophies()
-        season = lll.last_season
-        save_leaderboard(lll.dbname, current_leaderboard, season)
-    page_no = 0
-    current_leaderboard, season = load_leaderboard(lll.dbname)
-    content = format_leaderboard(
-        data=current_leaderboard,
-        title=format_leaderboard_title(season=season),
-        page_no=page_no,
-        max_lines=max_lines,
-        center=1,
-        season_countdown=lll.get_countdown_current_season() if season == lll.current_season else None,
-    )
-    message_sent = await ctx.send(content)
-    for emoji in '⏮ ⏪ ⏩ ⏭ 🔄'.split():
-      logging.info('react with {}'.format(emoji))
-      await message_sent.add_reaction(emoji)
+        save_leaderboard(lll.dbname, await lll.get_last_season_trophies(), lll.last_season)
+    show_global_rank = ('-g' in args) or ('--global-rank' in args)
+    if show_global_rank:
+        # a closed season is only fetched down to the players of the leaderboard
+        await lll.update_rank_indices(season_id=None if season == lll.current_season else season,
+                                      player_tags=current_leaderboard['player_tag'].to_list())
+        for key in [key for key in page_cache if key[1]]:
+            del page_cache[key]
+    content = render_page(0, show_global_rank)
+    with tracing.span('discord.send'):
+        message_sent = await ctx.send(content)
+    update_queue.remember(message_sent, content)
+    register_live_message(message_sent, 0, show_global_rank)
+    update_queue.add_reactions(message_sent, page_emojis)
 
 
 # turning pages
@@ -136,19 +444,21 @@ async def on_reaction_add(reaction, user):
     emoji = reaction.emoji
     message = reaction.message
 
-    if user.bot:
+    if user.bot or (emoji not in page_emojis):
         return
 
     logging.info('received reaction from {} with {}'.format(user.name, emoji))
     logging.info('message id: {}'.format(message.id))
 
-    global page_no
-    global current_leaderboard
-    global season
-
-    current_leaderboard, season = load_leaderboard(lll.dbname)
-
-    page_max = math.ceil(len(current_leaderboard) / max_lines)
+    await warmed_up.wait()
+    if message.id not in live_messages:
+        if (message.author != bot.user) or not is_leaderboard_page(message.content):
+            return
+        # a leaderboard message posted before the bot restarted
+        register_live_message(message)
+    entry = live_messages[message.id]
+    page_no = entry[1]
+    page_max = get_page_max()
 
     if emoji == '⏮':
       page_no = 0
@@ -163,22 +473,16 @@ async def on_reaction_add(reaction, user):
     elif emoji == '⏭':
         page_no = page_max - 1
     elif emoji == '🔄':
-      page_no = 0
-      current_leaderboard = await lll.get_current_season_trophies()
-      season = lll.current_season
-      save_leaderboard(lll.dbname, current_leaderboard, season)
+      entry[1] = 0
+      update_queue.remove_reaction(message, emoji, user)
+      # all the live messages are updated once the leaderboard is saved
+      save_leaderboard(lll.dbname, await lll.get_current_season_trophies(), lll.current_season)
+      return
     else:
       return
-    content = format_leaderboard(
-        data=current_leaderboard,
-        title=format_leaderboard_title(season=season),
-        page_no=page_no,
-        max_lines=max_lines,
-        center=1,
-        season_countdown=lll.get_countdown_current_season() if season == lll.current_season else None,
-    )
-    await message.edit(content=content)
-    await reaction.remove(user)
+    entry[1] = page_no
+    update_queue.edit(message, render_page(page_no, entry[2]))
+    update_queue.remove_reaction(message, emoji, user)
 
 
 # register a player
@@ -187,7 +491,8 @@ async def register(ctx, *args):
     ''' Added player(s) to the leaderboard.
     '''
     logging.info("registering following players: {}".format(", ".join(args)))
-    successful_players, unqualified_players, failed_tags = await lll.register_players(player_tags=args)
+    successful_players, unqualified_players, failed_tags = await lll.register_players(
+        player_tags=args, owner=ctx.author.id)
     content = []
     if successful_players:
       msg1 = '\n'.join(['{} ({})'.format(name, tag) for tag, name in successful_players.items()])
@@ -222,7 +527,7 @@ async def remove(ctx, *args):
     ''' Remove player(s) from the leaderboard.
     '''
     logging.info("removing following players: {}".format(", ".join(args)))
-    removed_players = lll.remove_players(args)
+    removed_players = lll.remove_players(args, owner=None if check_adimin_perm(ctx) else ctx.author.id)
     content = 'No player tag was removed.'
     if removed_players:
       msg = ', '.join(removed_players)
@@ -235,6 +540,42 @@ async def remove(ctx, *args):
     await ctx.send(content)
 
 
+# verify player accounts
+@bot.command(name='verify')
+async def verify(ctx, *args):
+    ''' Verify player account(s) with in-game API tokens and link them to the user.
+
+    Usage: !verify <player tag> <API token> [<player tag> <API token> ...]
+    Without arguments, show the players linked to the user.
+    '''
+    if not args:
+        linked_players = lll.get_linked_players(ctx.author.id)
+        await ctx.send("Linked players: {}".format(', '.join(linked_players) or 'none'))
+        return
+    if len(args) % 2:
+        await ctx.send("Usage: !verify <player tag> <API token> [<player tag> <API token> ...]")
+        return
+    try:
+        # keep the tokens out of the channel
+        await ctx.message.delete()
+    except discord.HTTPException:
+        pass
+    tokens = dict(zip(args[::2], args[1::2]))
+    verified, failed_tags = await lll.coc.verify_players(tokens)
+    verified_tags = [player_tag for player_tag, ok in verified.items() if ok]
+    if verified_tags:
+        lll.link_accounts(ctx.author.id, verified_tags)
+    content = []
+    if verified_tags:
+        content.append("Verified players: {}".format(', '.join(verified_tags)))
+    invalid_tags = [player_tag for player_tag, ok in verified.items() if not ok]
+    if invalid_tags:
+        content.append("Invalid API tokens for players: {}".format(', '.join(invalid_tags)))
+    if failed_tags:
+        content.append("Failed to verify players: {}".format(', '.join(failed_tags)))
+    await ctx.send("\n".join(content))
+
+
 # register a clan
 @bot.command(name='register_clan')
 async def register_clan(ctx, arg):
@@ -277,48 +618,90 @@ async def refresh(ctx):
 
 # list player tags
 @bot.command(name='players')
-async def players(ctx):
+async def players(ctx, *args):
     ''' Show the list of all players.
+
+    Usage: !players [page] [-c <clan tag>]
     '''
-    lll.load_player_tags()
-    players = []
-    for player_tag in lll.player_tags:
-        try:
-            player_info = lll.coc.get_player_info(player_tag)
-            players.append("{} ({})".format(player_info['name'], player_info['tag']))
-        except RuntimeError:
-            logging.warning("Failed to find player info for tag: {}".format(player_tag))
-    content = textwrap.dedent("""\
-        Players registered:
-        ```
-        {}
-        ```
-    """).format("\n".join(players))
-    await ctx.send(content)
+    page_no, clan_tag = parse_listing_args(args)
+    entries = directory.list_players(lll.dbname, lll.player_tags, clan_tag=clan_tag)
+    flagged_players = set(lll.flagged_players)
+    lines = []
+    for tag, name, _, clan_name, updated in entries:
+        lines.append("{} ({}){} - {}{}".format(
+            name or "?", tag, " [{}]".format(clan_name) if clan_name else "", directory.format_age(updated),
+            " - ⚠ left the qualified clans" if tag in flagged_players else ""))
+    await ctx.send(format_listing("Players registered", lines, page_no))
 
 
 # list clan tags
 @bot.command(name='clans')
-async def clans(ctx):
+async def clans(ctx, *args):
     ''' Show the list of all clans.
+
+    Usage: !clans [page]
     '''
-    lll.load_qualified_clans()
-    clans = []
-    for clan_tag in lll.qualified_clans:
-        try:
-            clan_info = lll.coc.get_clan_info(clan_tag)
-            clans.append("{} ({})".format(clan_info['name'], clan_info['tag']))
-        except RuntimeError:
-            logging.warning("Failed to find clan info for tag: {}".format(clan_tag))
-    content = textwrap.dedent("""\
-        Clan registered:
-        ```
-        {}
-        ```
-    """).format("\n".join(clans))
+    page_no, _ = parse_listing_args(args)
+    entries = directory.list_clans(lll.dbname, lll.qualified_clans)
+    lines = ["{} ({}) - {}".format(name or "?", tag, directory.format_age(updated))
+             for tag, name, updated in entries]
+    await ctx.send(format_listing("Clans registered", lines, page_no))
+
+
+# show player statistics
+@bot.command(name='stats')
+async def stats(ctx, player_tag):
+    ''' Show the statistics of a player in the current season.
+    '''
+    season = lll.current_season
+    days, hours = lll.get_countdown_current_season()
+    player_stats = stats_cache.get(season, remaining_days=days + hours / 24)
+    content = format_player_stats(player_stats, player_tag.upper(), season)
+    if content is None:
+        content = 'No statistics found for player {}.'.format(player_tag)
     await ctx.send(content)
 
 
+# show season report
+@bot.command(name='season-report')
+async def season_report(ctx):
+    ''' Show the statistics of all players in the current season.
+    '''
+    season = lll.current_season
+    days, hours = lll.get_countdown_current_season()
+    player_stats = stats_cache.get(season, remaining_days=days + hours / 24)
+    await ctx.send(format_season_report(player_stats, season, max_lines=20))
+
+
+# show clan war league summary
+@bot.command(name='cwl')
+async def cwl(ctx, clan_tag):
+    ''' Show the stars and destruction of the clan members across the CWL rounds.
+    '''
+    clan_tag = clan_tag.upper()
+    try:
+        group_info = await lll.coc.get_sccwl_group_info(clan_tag)
+        wars = await lll.coc.get_cwl_wars(clan_tag, group_info=group_info)
+    except RuntimeError:
+        logging.warning("Failed to find cwl info for clan: {}".format(clan_tag))
+        await ctx.send("Failed to find CWL of clan {}.".format(clan_tag))
+        return
+    clan_name = next((clan['name'] for clan in group_info['clans'] if clan['tag'] == clan_tag), clan_tag)
+    await ctx.send(format_cwl_summary(summarize_cwl(clan_tag, wars), clan_name))
+
+
+# profile commands
+@bot.command(name='profile')
+async def profile(ctx, count: int = 1):
+    ''' Profile the next commands and dump the results into files.
+    '''
+    if not check_adimin_perm(ctx):
+        await ctx.send("User does not have sufficient permission to profile commands.")
+        return
+    profiler.arm(count)
+    await ctx.send("Profiling the next {} commands into {}.".format(count, profiler.directory))
+
+
 # list player tags
 @bot.command(name='credit')
 async def credit(ctx):
@@ -336,4 +719,5 @@ async def credit(ctx):
 
 
 if __name__ == '__main__':
+  bot.loop.create_task(warm_up())
   bot.run(TOKEN)
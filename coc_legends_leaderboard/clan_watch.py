@@ -0,0 +1,76 @@
+import asyncio
+import logging
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+class ClanWatcher:
+    '''
+    Watch the member lists of clans and report who joined and who left.
+
+    The member lists of all clans are requested concurrently and diffed against the previous
+    poll, so the work done with the results is proportional to the membership churn.
+
+    Parameters
+    ----------
+    coc          : coc.ClashOfClans
+        The API wrapper.
+    initial_sync : bool, optional, default to False
+        Whether to report every member as joined on the first poll of a clan. Otherwise the
+        first poll only records the members.
+    '''
+
+    def __init__(self, coc, initial_sync=False):
+        self.coc = coc
+        self.initial_sync = initial_sync
+        # clan tag -> {player tag: player name}
+        self._members = {}
+
+    async def poll(self, clan_tags):
+        ''' Poll the member lists of the clans.
+
+        Players moving between two watched clans are neither joiners nor leavers. If the member
+        list of a clan fails to load, its previous members are kept as they were.
+
+        Parameters
+        ----------
+        clan_tags : list of str
+            Tags of the clans to watch.
+
+        Returns
+        -------
+        joined : dict(str, str)
+            The dictionary of player tags and player names that joined the clans.
+        left   : dict(str, str)
+            The dictionary of player tags and player names that left the clans.
+        '''
+        previous = {}
+        for clan_tag, members in self._members.items():
+            previous.update(members)
+        for clan_tag in list(self._members):
+            if clan_tag not in clan_tags:
+                del self._members[clan_tag]
+
+        results = await asyncio.gather(
+            *[self.coc.get_clan_members(clan_tag) for clan_tag in clan_tags],
+            return_exceptions=True)
+        first_poll = set()
+        for clan_tag, members in zip(clan_tags, results):
+            if isinstance(members, Exception):
+                logging.warning('Failed to get members of clan {}: {}'.format(clan_tag, members))
+                continue
+            if clan_tag not in self._members:
+                first_poll.add(clan_tag)
+            self._members[clan_tag] = {member['tag']: member['name'] for member in members}
+
+        current = {}
+        for clan_tag, members in self._members.items():
+            if (clan_tag in first_poll) and not self.initial_sync:
+                # only a baseline, keep them out of the joiners
+                previous.update(members)
+            current.update(members)
+
+        joined = {tag: name for tag, name in current.items() if tag not in previous}
+        left = {tag: name for tag, name in previous.items() if tag not in current}
+        return joined, left
@@ -8,11 +8,77 @@ import dateutil.parser
 from urllib.parse import quote
 from dotenv import load_dotenv
 
+import json_backend
+from models import Player
+from tracing import traced
+
 
 logging.basicConfig(level=logging.INFO)
 PATH = os.path.dirname(os.path.abspath(__file__))
 
 
+def format_stars(stars):
+    return '⭐️' * stars + '   ' * (3 - stars)
+
+
+def get_war_player_names(war_info):
+    """ Map the tags of all the players in a war to their names.
+    """
+    return {member['tag']: member['name']
+            for member in war_info['clan']['members'] + war_info['opponent']['members']}
+
+
+def get_war_attacks(war_info, after_order=0):
+    """ Get the attacks of a war in order.
+
+    Parameters
+    ----------
+    war_info    : dict
+        The war info, see ``ClashOfClans.get_current_war_info``.
+    after_order : int, optional, default to 0
+        Only get the attacks with ``order`` larger than this.
+
+    Returns
+    -------
+    attacks : list of tuple(dict, bool)
+        The attacks sorted by ``order``, each with whether it is an attack of the clan
+        (True) or of the opponent (False).
+    """
+    attacks = []
+    for side, outgoing in (('clan', True), ('opponent', False)):
+        for member in war_info[side].get('members', []):
+            for attack in member.get('attacks', []):
+                if attack['order'] > after_order:
+                    attacks.append((attack, outgoing))
+    attacks.sort(key=lambda item: item[0]['order'])
+    return attacks
+
+
+def format_war_attack(attack, outgoing, player_names):
+    """ Format an attack of a war into a line, the clan member is always on the left.
+    """
+    stars = format_stars(attack['stars'])
+    percent = '{:>3.2f}%'.format(attack['destructionPercentage'])
+    if outgoing:
+        return '{:<15s} -- {} {} -> {:>15s}'.format(
+            player_names[attack['attackerTag']],
+            stars,
+            percent,
+            player_names[attack['defenderTag']],
+        )
+    return '{:<15s} <- {} {} -- {:>15s}'.format(
+        player_names[attack['defenderTag']],
+        stars,
+        percent,
+        player_names[attack['attackerTag']],
+    )
+
+
+class NotFoundError(RuntimeError):
+    """ The requested resource does not exist (HTTP 404), e.g. a banned player.
+    """
+
+
 class ClashOfClans:
     """
     Generic Clash of Clans API wrapper.
@@ -21,14 +87,28 @@ class ClashOfClans:
 
     Paremeters
     ----------
-    api_token : str
+    api_token       : str
         The API token for authentication.
+    rate_limiter    : object, optional, default to None
+        If given, ``await rate_limiter.acquire()`` is called before every request, e.g. a
+        ``rate_limit.SharedRateLimiter`` shared by several processes.
+    max_connections : int, optional, default to 100
+        The maximum number of connections of the pooled session, see ``open``.
+    http_cache      : http_cache.HttpCache, optional, default to None
+        If given, responses are cached on disk and revalidated with their ETag.
     """
 
     base_url = "https://api.clashofclans.com/v1"
+    legend_league_id = 29000022
 
-    def __init__(self, api_token):
+    def __init__(self, api_token, rate_limiter=None, max_connections=100, http_cache=None):
         self.api_token = api_token
+        self.http_cache = http_cache
+        self.rate_limiter = rate_limiter
+        self.max_connections = max_connections
+        self._session = None
+        self._cwl_war_cache = {}
+        self._cwl_war_clans = {}
 
     @property
     def headers(self):
@@ -40,6 +120,186 @@ class ClashOfClans:
         }
         return headers
 
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def open(self):
+        """ Open a pooled session that is reused by all the requests until ``close``.
+
+        Without a pooled session, every request opens its own session.
+        """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        """ Close the pooled session.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_json(self, url, params=None, error_message=None):
+        """ Send a GET request and return the decoded JSON data.
+
+        Parameters
+        ----------
+        url           : str
+            The request url.
+        params        : dict, optional, default to None
+            The query parameters.
+        error_message : str, optional, default to None
+            The message of the error raised if the request fails.
+
+        Returns
+        -------
+        data : dict
+            A dictionary of the JSON data returned from the request.
+        """
+        return json_backend.loads(await self._get_bytes(url, params=params, error_message=error_message))
+
+    @traced('coc.request')
+    async def _get_bytes(self, url, params=None, error_message=None):
+        """ Send a GET request and return the raw response body.
+
+        With an ``http_cache``, fresh cached responses are returned without a request, and
+        stale ones are revalidated with their ETag.
+
+        See ``_get_json`` for the parameters.
+        """
+        cache_key = None
+        cached = None
+        headers = self.headers
+        if self.http_cache is not None:
+            cache_key = self.http_cache.make_key(url, params)
+            # the read waits for a flush of the cache, so it runs in an executor
+            loop = asyncio.get_event_loop()
+            cached = await loop.run_in_executor(None, self.http_cache.get, cache_key)
+            if cached is not None:
+                if cached.is_fresh():
+                    return cached.body
+                if cached.etag:
+                    headers["If-None-Match"] = cached.etag
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        if self._session is None:
+            async with aiohttp.ClientSession() as session:
+                status, body, respond_headers = await self._send_get(session, url, params, headers)
+        else:
+            status, body, respond_headers = await self._send_get(self._session, url, params, headers)
+
+        if status == 304 and cached is not None:
+            self.http_cache.touch(cache_key, self.http_cache.expires_from_headers(respond_headers))
+            return cached.body
+        elif status == 200:
+            if self.http_cache is not None:
+                self.http_cache.put(cache_key, body, respond_headers.get("ETag"),
+                                    self.http_cache.expires_from_headers(respond_headers))
+            return body
+        elif status == 404:
+            raise NotFoundError(error_message or "Not found: {}.".format(url))
+        else:
+            raise RuntimeError(error_message or "Failed to request {} ({}).".format(url, status))
+
+    async def _send_get(self, session, url, params, headers):
+        async with session.get(url, headers=headers, params=params) as respond:
+            body = await respond.read() if respond.status == 200 else None
+            return respond.status, body, respond.headers
+
+    async def iter_pages(self, url, limit=None, page_size=200):
+        """ Iterate through the pages of a paginated endpoint.
+
+        The pages are linked by the ``after`` cursor of the previous page, so they are requested
+        one after another and yielded as soon as they arrive.
+
+        Parameters
+        ----------
+        url       : str
+            The request url.
+        limit     : int, optional, default to None
+            The maximum number of items to fetch in total. If None, fetch all the pages.
+        page_size : int, optional, default to 200
+            The number of items requested for each page.
+
+        Yields
+        ------
+        items : list of dict
+            The items of a page.
+        """
+        fetched = 0
+        params = {"limit": page_size if limit is None else min(page_size, limit)}
+        while True:
+            page = await self._get_json(url, params=params)
+            items = page.get('items', [])
+            if limit is not None:
+                items = items[:limit - fetched]
+            fetched += len(items)
+            if items:
+                yield items
+            after = page.get('paging', {}).get('cursors', {}).get('after')
+            if (not items) or (not after) or (limit is not None and fetched >= limit):
+                break
+            # the last page only requests the remaining items
+            params = {"limit": page_size if limit is None else min(page_size, limit - fetched), "after": after}
+
+    async def get_location_player_rankings(self, location_id='global', limit=None):
+        """ Get the player rankings of a location.
+
+        Parameters
+        ----------
+        location_id : int or str, optional, default to 'global'
+            The location id, 'global' for the global rankings.
+        limit       : int, optional, default to None
+            The maximum number of players to fetch.
+
+        Returns
+        -------
+        rankings : list of dict
+            List of ranked players, each with ``tag``, ``name``, ``trophies`` and ``rank``.
+        """
+        url = self.base_url + "/locations/{location_id}/rankings/players".format(
+            location_id=quote(str(location_id)))
+        rankings = []
+        async for items in self.iter_pages(url, limit=limit):
+            rankings.extend(items)
+        return rankings
+
+    async def get_legend_season_rankings(self, season_id, limit=None, page_size=1000, player_tags=None):
+        """ Get the player rankings of a closed Legend League season.
+
+        Parameters
+        ----------
+        season_id   : str
+            The season id, e.g. '2021-03'.
+        limit       : int, optional, default to None
+            The maximum number of players to fetch.
+        page_size   : int, optional, default to 1000
+            The number of players requested for each page.
+        player_tags : list of str, optional, default to None
+            If given, stop fetching the pages once all these players are found.
+
+        Returns
+        -------
+        rankings : list of dict
+            List of ranked players, each with ``tag``, ``name``, ``trophies`` and ``rank``.
+        """
+        url = self.base_url + "/leagues/{league_id}/seasons/{season_id}".format(
+            league_id=self.legend_league_id, season_id=quote(season_id))
+        rankings = []
+        missing = None if player_tags is None else set(player_tags)
+        async for items in self.iter_pages(url, limit=limit, page_size=page_size):
+            rankings.extend(items)
+            if missing is not None:
+                missing.difference_update(item['tag'] for item in items)
+                if not missing:
+                    break
+        return rankings
+
     async def get_player_info(self, player_tag):
         """ Get player info from player tag.
 
@@ -54,12 +314,29 @@ class ClashOfClans:
             A dictionary of the JSON data returned from the request.
         """
         url = self.base_url + "/players/" + quote(player_tag)
-        async with aiohttp.ClientSession() as session:
-          async with session.get(url, headers=self.headers) as respond:
-            if respond.status == 200:
-                return await respond.json()
-            else:
-                raise RuntimeError(f"Failed to obtain player information. {player_tag}")
+        return await self._get_json(url, error_message=f"Failed to obtain player information. {player_tag}")
+
+    async def get_player(self, player_tag, keep_raw=True):
+        """ Get player from player tag as a compact model.
+
+        Only the fields used by the leaderboard are decoded into the model, the full payload
+        can still be materialized with ``Player.to_dict`` if ``keep_raw`` is True.
+
+        Parameters
+        ----------
+        player_tag : str, starts with '#'
+            The player tag '#...'.
+        keep_raw   : bool, optional, default to True
+            Whether to keep the raw payload in the model.
+
+        Returns
+        -------
+        player : models.Player
+            The player model.
+        """
+        url = self.base_url + "/players/" + quote(player_tag)
+        raw = await self._get_bytes(url, error_message=f"Failed to obtain player information. {player_tag}")
+        return Player.from_json(raw, keep_raw=keep_raw)
 
     async def get_clan_info(self, clan_tag):
         """ Get clan info from clan tag.
@@ -75,12 +352,26 @@ class ClashOfClans:
             A dictionary of the JSON data returned from the request.
         """
         url = self.base_url + "/clans/" + quote(clan_tag)
-        async with aiohttp.ClientSession() as session:
-          async with session.get(url, headers=self.headers) as respond:
-            if respond.status == 200:
-                return await respond.json()
-            else:
-                raise RuntimeError("Failed to obtain clan information.")
+        return await self._get_json(url, error_message="Failed to obtain clan information.")
+
+    async def get_clan_members(self, clan_tag):
+        """ Get the members of a clan from clan tag.
+
+        Parameters
+        ----------
+        clan_tag : str, starts with '#'
+            The clan tag '#...'.
+
+        Returns
+        -------
+        members : list of dict
+            List of members, each with ``tag``, ``name``, ``role``, ``trophies``, ...
+        """
+        url = self.base_url + "/clans/" + quote(clan_tag) + "/members"
+        members = []
+        async for items in self.iter_pages(url, page_size=50):
+            members.extend(items)
+        return members
 
     async def get_league_info(self):
         """ Get home village trophy league info.
@@ -91,12 +382,7 @@ class ClashOfClans:
             A dictionary of the JSON data returned from the request.
         """
         url = self.base_url + "/leagues"
-        async with aiohttp.ClientSession() as session:
-          async with session.get(url, headers=self.headers) as respond:
-            if respond.status == 200:
-                return await respond.json()
-            else:
-                raise RuntimeError("Failed to obtain clan information.")
+        return await self._get_json(url, error_message="Failed to obtain clan information.")
 
     async def get_sccwl_group_info(self, clan_tag):
         """ Get the league group info of current SCCWL season of the clan.
@@ -114,12 +400,7 @@ class ClashOfClans:
         url = self.base_url + \
             '/clans/{clan_tag}/currentwar/leaguegroup'.format(
                 clan_tag=quote(clan_tag))
-        async with aiohttp.ClientSession() as session:
-          async with session.get(url, headers=self.headers) as respond:
-            if respond.status == 200:
-                return await respond.json()
-            else:
-                raise RuntimeError("Failed to obtain sccwl group information.")
+        return await self._get_json(url, error_message="Failed to obtain sccwl group information.")
 
     async def get_sccwl_lineup(self, clan_tag):
         """ Get the SCCWL lineup of the clan of the current season.
@@ -135,20 +416,76 @@ class ClashOfClans:
             List of members that are in the SCCWL spin.
         """
         info = await self.get_sccwl_group_info(clan_tag=clan_tag)
-        for clan in info['clans']:
+        return self._get_group_lineup(info, clan_tag)
+
+    @staticmethod
+    def _get_group_lineup(group_info, clan_tag):
+        for clan in group_info['clans']:
             if clan['tag'] == clan_tag:
-                current_clan = clan
-        return current_clan['members']
+                return clan['members']
+        raise RuntimeError("Clan {} is not in the sccwl group.".format(clan_tag))
+
+    async def _find_missing_members(self, lineup, early_exit=True, semaphore=None):
+        """ Look up the members of a lineup concurrently and find the missing ones.
+
+        Parameters
+        ----------
+        lineup     : list of dict
+            List of members, each with ``tag``, ``name`` and ``townHallLevel``.
+        early_exit : bool, optional, default to True
+            Whether to cancel the remaining lookups once the first missing member is found.
+        semaphore  : asyncio.Semaphore, optional, default to None
+            If given, limits the number of concurrent lookups.
+
+        Returns
+        -------
+        missing_members : list of dict
+            The members that are not found (HTTP 404). Only the first one if ``early_exit``.
+        """
+        semaphore = semaphore or asyncio.Semaphore(self.max_connections)
+
+        async def lookup(member):
+            async with semaphore:
+                try:
+                    await self.get_player(member['tag'], keep_raw=False)
+                except NotFoundError:
+                    return member
+            return None
+
+        tasks = [asyncio.ensure_future(lookup(member)) for member in lineup]
+        missing_members = []
+        try:
+            for future in asyncio.as_completed(tasks):
+                # errors other than 404 are not bans and are raised
+                member = await future
+                if member is not None:
+                    missing_members.append(member)
+                    if early_exit:
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return missing_members
+
+    @staticmethod
+    def _log_missing_members(clan_tag, missing_members):
+        for player in missing_members:
+            logging.warning('player {} ({}) of clan {} not found, th{}'.format(
+                player['name'], player['tag'], clan_tag, player['townHallLevel']))
 
     async def check_clan_pass_sccwl_scan(self, clan_tag, verbose=False):
         """ Check if clan has banned members after SCCWL.
 
+        The lineup is looked up concurrently, and the scan stops at the first banned member
+        unless ``verbose`` is set.
+
         Parameters
         ----------
         clan_tag : str, starts with '#'
             The clan tag '#...'.
         verbose  : bool, optional, default to Fase
-            Whether to print out players that got banned.
+            Whether to scan the whole lineup and print out all the players that got banned.
 
         Returns
         -------
@@ -156,15 +493,133 @@ class ClashOfClans:
             If True, clan does not have banned members, vice versa.
         """
         lineup = await self.get_sccwl_lineup(clan_tag=clan_tag)
-        for player in lineup:
-            try:
-                await self.get_player_info(player['tag'])
-            except RuntimeError:
-                if verbose:
-                    logging.warning('player {} ({}) not found, th{}'.format(
-                        player['name'], player['tag'], player['townHallLevel']))
-                return False
-        return True
+        missing_members = await self._find_missing_members(lineup, early_exit=not verbose)
+        if verbose:
+            self._log_missing_members(clan_tag, missing_members)
+        return not missing_members
+
+    async def check_sccwl_group_pass_scan(self, clan_tag, verbose=False):
+        """ Check every clan of the SCCWL group of the clan for banned members.
+
+        All the clans are scanned concurrently from a single group request.
+
+        Parameters
+        ----------
+        clan_tag : str, starts with '#'
+            The clan tag '#...' of any clan in the group.
+        verbose  : bool, optional, default to Fase
+            Whether to scan the whole lineups and print out a report of each clan.
+
+        Returns
+        -------
+        report : dict(str, dict)
+            The scan of each clan in the group, with the keys ``missing_members``, the banned
+            members, empty if the clan passes the scan, and ``error``, the error that stopped the
+            scan of the clan, None if it completed. Without ``verbose``, at most the first banned
+            member is listed for each clan.
+        """
+        info = await self.get_sccwl_group_info(clan_tag=clan_tag)
+        semaphore = asyncio.Semaphore(self.max_connections)
+        clan_tags = [clan['tag'] for clan in info['clans']]
+        tasks = [asyncio.ensure_future(self._find_missing_members(
+            self._get_group_lineup(info, tag), early_exit=not verbose, semaphore=semaphore))
+            for tag in clan_tags]
+        try:
+            # an error only fails the scan of its clan
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+        report = {}
+        for tag, result in zip(clan_tags, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                logging.warning('Failed to scan clan {}: {}'.format(tag, result))
+                report[tag] = {'missing_members': [], 'error': str(result)}
+            else:
+                report[tag] = {'missing_members': result, 'error': None}
+        if verbose:
+            for clan in info['clans']:
+                entry = report[clan['tag']]
+                missing_members = entry['missing_members']
+                if entry['error'] is not None:
+                    status = 'failed, {}'.format(entry['error'])
+                elif missing_members:
+                    status = '{} banned members'.format(len(missing_members))
+                else:
+                    status = 'passed'
+                logging.info('{} ({}): {}'.format(clan['name'], clan['tag'], status))
+                self._log_missing_members(clan['tag'], missing_members)
+        return report
+
+    async def get_cwl_war_info(self, war_tag):
+        """ Get the info of a war in the clan war league from war tag.
+
+        Wars that have ended never change, so they are cached and only requested once.
+
+        Parameters
+        ----------
+        war_tag : str, starts with '#'
+            The war tag '#...', see ``rounds[].warTags`` of ``get_sccwl_group_info``.
+
+        Returns
+        -------
+        war_info : dict
+            A dictionary of the JSON data returned from the request.
+        """
+        if war_tag in self._cwl_war_cache:
+            return self._cwl_war_cache[war_tag]
+        url = self.base_url + "/clanwarleagues/wars/" + quote(war_tag)
+        war_info = await self._get_json(url, error_message="Failed to obtain cwl war information.")
+        self._cwl_war_clans[war_tag] = (war_info['clan'].get('tag'), war_info['opponent'].get('tag'))
+        if war_info.get('state') == 'warEnded':
+            self._cwl_war_cache[war_tag] = war_info
+        return war_info
+
+    async def get_cwl_wars(self, clan_tag, group_info=None):
+        """ Get the wars of the clan in all the rounds of the current clan war league.
+
+        The rounds are requested concurrently. Ended wars come from the cache, and once the war
+        of the clan in a round is known, the other wars of that round are not requested again.
+
+        Parameters
+        ----------
+        clan_tag   : str, starts with '#'
+            The clan tag '#...'.
+        group_info : dict, optional, default to None
+            The league group info. If None, it is requested with ``get_sccwl_group_info``.
+
+        Returns
+        -------
+        wars : list of dict
+            The war info of the clan in each round that has started preparation, in round order.
+            Rounds whose wars could not be requested are left out.
+        """
+        if group_info is None:
+            group_info = await self.get_sccwl_group_info(clan_tag)
+
+        async def get_round_war(war_tags):
+            for war_tag in war_tags:
+                if clan_tag in self._cwl_war_clans.get(war_tag, ()):
+                    war_tags = [war_tag]
+                    break
+            # a war that fails, e.g. not generated yet, is skipped instead of failing the league
+            wars = await asyncio.gather(*[self.get_cwl_war_info(war_tag) for war_tag in war_tags],
+                                        return_exceptions=True)
+            for war_tag, war in zip(war_tags, wars):
+                if isinstance(war, asyncio.CancelledError):
+                    raise war
+                if isinstance(war, Exception):
+                    logging.warning('Failed to obtain cwl war {}: {}'.format(war_tag, war))
+                elif clan_tag in (war['clan']['tag'], war['opponent']['tag']):
+                    return war
+            return None
+
+        rounds = [[war_tag for war_tag in cwl_round['warTags'] if war_tag != '#0']
+                  for cwl_round in group_info.get('rounds', [])]
+        wars = await asyncio.gather(*[get_round_war(war_tags) for war_tags in rounds if war_tags])
+        return [war for war in wars if war is not None]
 
     async def get_current_war_info(self, clan_tag):
         """ Get current war info from clan tag.
@@ -180,13 +635,7 @@ class ClashOfClans:
             A dictionary of the JSON data returned from the request.
         """
         url = self.base_url + "/clans/" + quote(clan_tag) + "/currentwar"
-        async with aiohttp.ClientSession() as session:
-          async with session.get(url, headers=self.headers) as respond:
-            if respond.status == 200:
-                return await respond.json()
-            else:
-                raise RuntimeError(
-                    "Failed to obtain clan current war information.")
+        return await self._get_json(url, error_message="Failed to obtain clan current war information.")
 
     async def print_current_war(self, clan_tag):
         """ Print out the status of the current war of the clan.
@@ -197,43 +646,16 @@ class ClashOfClans:
             The clan tag '#...'.
         """
         war_info = await self.get_current_war_info(clan_tag)
-        player_names = {}
+        player_names = get_war_player_names(war_info)
         clan_name = war_info['clan']['name']
         opponent_name = war_info['opponent']['name']
-        # at most 2 hits each player
-        attacks = [None, ] * war_info['teamSize'] * 4 
         clan_stars = war_info['clan']['stars']
         clan_percent = war_info['clan']['destructionPercentage']
         opponent_stars = war_info['opponent']['stars']
         opponent_percent = war_info['opponent']['destructionPercentage']
 
-        for member in war_info['clan']['members'] + war_info['opponent']['members']:
-            player_names[member['tag']] = member['name']
-
-        def format_stars(stars):
-            return '⭐️' * stars + '   ' * (3 - stars)
-
-        for member in war_info['clan']['members']:
-            for attack in member.get('attacks', []):
-                stars = format_stars(attack['stars'])
-                percent = '{:>3.2f}%'.format(attack['destructionPercentage'])
-                attacks[attack['order']] = '{:<15s} -- {} {} -> {:>15s}'.format(
-                    player_names[attack['attackerTag']],
-                    stars,
-                    percent,
-                    player_names[attack['defenderTag']],
-                )
-
-        for member in war_info['opponent']['members']:
-            for attack in member.get('attacks', []):
-                stars = format_stars(attack['stars'])
-                percent = '{:>3.2f}%'.format(attack['destructionPercentage'])
-                attacks[attack['order']] = '{:<15s} <- {} {} -- {:>15s}'.format(
-                    player_names[attack['defenderTag']],
-                    stars,
-                    percent,
-                    player_names[attack['attackerTag']],
-                )
+        attacks = [format_war_attack(attack, outgoing, player_names)
+                   for attack, outgoing in get_war_attacks(war_info)]
 
         clan_percent_str = '{:>3.2f}%'.format(clan_percent)
         opponent_percent_str = '{:>3.2f}%'.format(opponent_percent)
@@ -249,9 +671,7 @@ class ClashOfClans:
                                                   opponent_percent_str), linewidth),
             separation,
         ]
-        for attack in attacks:
-            if attack is not None:
-                output.append(attack)
+        output.extend(attacks)
         output.append(separation)
         # output.append(war_info['state'])
 
@@ -291,15 +711,55 @@ class ClashOfClans:
         body = {
             "token": token,
         }
-        async with aiohttp.ClientSession() as session:
-          async with session.get(url, headers=self.headers) as respond:
-            if respond.status == 200:
-                status = await respond.json()['status']
-                return status.lower() == "ok"
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        if self._session is None:
+            async with aiohttp.ClientSession() as session:
+                status, data = await self._send_verify(session, url, body)
+        else:
+            status, data = await self._send_verify(self._session, url, body)
+        if status == 200:
+            return data["status"].lower() == "ok"
+        elif status == 404:
+            raise NotFoundError("Player {} not found.".format(player_tag))
+        else:
+            raise RuntimeError("Failed to verify player {} ({}).".format(player_tag, status))
+
+    async def _send_verify(self, session, url, body):
+        async with session.post(url, headers=self.headers, json=body) as respond:
+            data = (await respond.json()) if respond.status == 200 else None
+            return respond.status, data
+
+    async def verify_players(self, tokens):
+        """ Verify several players' accounts concurrently.
+
+        Parameters
+        ----------
+        tokens : dict(str, str)
+            The dictionary of player tags and their in-game API tokens.
+
+        Returns
+        -------
+        verified    : dict(str, bool)
+            The dictionary of player tags and whether they are verified with their tokens.
+        failed_tags : list of str
+            Tags of players that failed to be verified, e.g. not found.
+        """
+        player_tags = list(tokens)
+        results = await asyncio.gather(
+            *[self.verify_player(player_tag, tokens[player_tag]) for player_tag in player_tags],
+            return_exceptions=True)
+        verified = {}
+        failed_tags = []
+        for player_tag, result in zip(player_tags, results):
+            if isinstance(result, Exception):
+                logging.warning("Failed to verify player {}: {}".format(player_tag, result))
+                failed_tags.append(player_tag)
             else:
-                raise RuntimeError("Failed to obtain player information.")
-            
-            
+                verified[player_tag] = result
+        return verified, failed_tags
+
+
 if __name__ == "__main__":
     load_dotenv()
     api_token = os.getenv("COC_TOLEN")
@@ -0,0 +1,81 @@
+import logging
+import pandas as pd
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+def summarize_cwl(clan_tag, wars):
+    '''
+    Summarize the attacks of the members of a clan across the clan war league rounds.
+
+    Parameters
+    ----------
+    clan_tag : str, starts with '#'
+        The clan tag '#...'.
+    wars     : list of dict
+        The wars of the clan, see ``ClashOfClans.get_cwl_wars``.
+
+    Returns
+    -------
+    summary : pandas.DataFrame
+        A Pandas DataFrame indexed by player tag, with the ``name``, the number of ``rounds``
+        the member was in the lineup, the number of ``attacks``, the total ``stars`` and the
+        average ``destruction`` of the attacks. Sorted by stars and destruction.
+    '''
+    members = []
+    attacks = []
+    for war in wars:
+        clan = war['clan'] if war['clan']['tag'] == clan_tag else war['opponent']
+        for member in clan.get('members', []):
+            members.append({'player_tag': member['tag'], 'name': member['name']})
+            for attack in member.get('attacks', []):
+                attacks.append({
+                    'player_tag': member['tag'],
+                    'stars': attack['stars'],
+                    'destruction': attack['destructionPercentage'],
+                })
+    members = pd.DataFrame(members, columns=['player_tag', 'name'])
+    attacks = pd.DataFrame(attacks, columns=['player_tag', 'stars', 'destruction'])
+
+    summary = members.groupby('player_tag').agg(name=('name', 'last'), rounds=('name', 'size'))
+    summary = summary.join(attacks.groupby('player_tag').agg(
+        attacks=('stars', 'size'),
+        stars=('stars', 'sum'),
+        destruction=('destruction', 'mean'),
+    ))
+    summary[['attacks', 'stars']] = summary[['attacks', 'stars']].fillna(0).astype(int)
+    summary['destruction'] = summary['destruction'].fillna(0.)
+    return summary.sort_values(by=['stars', 'destruction'], ascending=False)
+
+
+def format_cwl_summary(summary, clan_name, name_pading=15):
+    '''
+    Format the clan war league summary into text for discord post.
+
+    Parameters
+    ----------
+    summary     : pandas.DataFrame
+        The summary, see ``summarize_cwl``.
+    clan_name   : str
+        The name of the clan.
+    name_pading : int, optional, default to 15
+        The width of the name column.
+    '''
+    header = '{:<{pad}s} {:>3} {:>3} {:>3} {:>7}'.format('Name', 'Rnd', 'Att', '⭐', '%', pad=name_pading)
+    content = [
+        'CWL Summary of {}'.format(clan_name),
+        '-' * len(header),
+        header,
+    ]
+    for _, member in summary.iterrows():
+        content.append('{:<{pad}.{pad}s} {:>3} {:>3} {:>3} {:>6.1f}%'.format(
+            member['name'],
+            member['rounds'],
+            member['attacks'],
+            member['stars'],
+            member['destruction'],
+            pad=name_pading,
+        ))
+    content.append('-' * len(header))
+    return '```\n{}\n```'.format('\n'.join(content))
@@ -0,0 +1,174 @@
+import os
+import datetime
+import sqlite3 as sql
+
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+PLAYER_TABLE = 'player_directory'
+CLAN_TABLE = 'clan_directory'
+
+
+def _connect(dbname):
+    con = sql.connect(os.path.join(PATH, dbname))
+    con.execute(
+        'CREATE TABLE IF NOT EXISTS {} '
+        '(player_tag TEXT PRIMARY KEY, name TEXT, clan_tag TEXT, clan_name TEXT, updated TEXT)'.format(
+            PLAYER_TABLE))
+    con.execute(
+        'CREATE INDEX IF NOT EXISTS ix_{table}_clan_tag ON {table} (clan_tag)'.format(table=PLAYER_TABLE))
+    con.execute(
+        'CREATE TABLE IF NOT EXISTS {} (clan_tag TEXT PRIMARY KEY, name TEXT, updated TEXT)'.format(
+            CLAN_TABLE))
+    return con
+
+
+def _format_timestamp(timestamp):
+    return (timestamp or datetime.datetime.utcnow()).isoformat(sep=' ')
+
+
+def update_players(dbname, players, timestamp=None):
+    ''' Record the names and clans of players, and the names of their clans, in the directory.
+
+    Parameters
+    ----------
+    dbname    : str
+        The database file name.
+    players   : list of models.Player or dict
+        The players. Dictionaries have the keys ``tag`` and ``name``, and optionally ``clan_tag``
+        and ``clan_name``; without ``clan_tag`` the recorded clan of the player is kept.
+    timestamp : datetime.datetime, optional, default to None
+        The time the players were seen, UTC now if None.
+    '''
+    updated = _format_timestamp(timestamp)
+    with_clans = []
+    without_clans = []
+    for player in players:
+        if isinstance(player, dict):
+            if 'clan_tag' in player:
+                with_clans.append((player['tag'], player['name'], player['clan_tag'],
+                                   player.get('clan_name'), updated))
+            else:
+                without_clans.append((player['tag'], player['name'], updated))
+        else:
+            clan = player.clan
+            with_clans.append((player.tag, player.name, clan and clan.tag, clan and clan.name, updated))
+    if not (with_clans or without_clans):
+        return
+    con = _connect(dbname)
+    try:
+        with con:
+            con.executemany(
+                'INSERT INTO {} VALUES (?, ?, ?, ?, ?) ON CONFLICT(player_tag) DO UPDATE SET '
+                'name = excluded.name, clan_tag = excluded.clan_tag, clan_name = excluded.clan_name, '
+                'updated = excluded.updated'.format(PLAYER_TABLE), with_clans)
+            con.executemany(
+                'INSERT INTO {} (player_tag, name, updated) VALUES (?, ?, ?) ON CONFLICT(player_tag) '
+                'DO UPDATE SET name = excluded.name, updated = excluded.updated'.format(PLAYER_TABLE),
+                without_clans)
+            # the clans of the players are seen as well
+            con.executemany(
+                'INSERT OR REPLACE INTO {} VALUES (?, ?, ?)'.format(CLAN_TABLE),
+                [(row[2], row[3], updated) for row in with_clans if row[2] and row[3]])
+    finally:
+        con.close()
+
+
+def update_clans(dbname, clans, timestamp=None):
+    ''' Record the names of clans in the directory.
+
+    Parameters
+    ----------
+    dbname    : str
+        The database file name.
+    clans     : list of dict
+        The clans, with the keys ``tag`` and ``name``.
+    timestamp : datetime.datetime, optional, default to None
+        The time the clans were seen, UTC now if None.
+    '''
+    updated = _format_timestamp(timestamp)
+    con = _connect(dbname)
+    try:
+        with con:
+            con.executemany(
+                'INSERT OR REPLACE INTO {} VALUES (?, ?, ?)'.format(CLAN_TABLE),
+                [(clan['tag'], clan['name'], updated) for clan in clans])
+    finally:
+        con.close()
+
+
+def _read(dbname, query, params=()):
+    con = _connect(dbname)
+    try:
+        return con.execute(query, params).fetchall()
+    finally:
+        con.close()
+
+
+def _parse_timestamp(updated):
+    return None if updated is None else datetime.datetime.fromisoformat(updated)
+
+
+def list_players(dbname, player_tags, clan_tag=None):
+    ''' List registered players from the directory, without any API request.
+
+    Parameters
+    ----------
+    dbname      : str
+        The database file name.
+    player_tags : list of str
+        Tags of the registered players.
+    clan_tag    : str, optional, default to None
+        If given, only list the players last seen in this clan.
+
+    Returns
+    -------
+    players : list of tuple(str, str or None, str or None, str or None, datetime.datetime or None)
+        The tag, name, clan tag, clan name and last update of every player, sorted by name.
+        Players that are not in the directory yet have no name, clan or update.
+    '''
+    rows = {row[0]: row for row in _read(
+        dbname, 'SELECT player_tag, name, clan_tag, clan_name, updated FROM {}'.format(PLAYER_TABLE))}
+    players = []
+    for player_tag in dict.fromkeys(player_tags):
+        tag, name, player_clan_tag, clan_name, updated = rows.get(player_tag, (player_tag, None, None, None, None))
+        if (clan_tag is not None) and (player_clan_tag != clan_tag):
+            continue
+        players.append((tag, name, player_clan_tag, clan_name, _parse_timestamp(updated)))
+    return sorted(players, key=lambda player: ((player[1] or '').lower(), player[0]))
+
+
+def list_clans(dbname, clan_tags):
+    ''' List registered clans from the directory, without any API request.
+
+    Parameters
+    ----------
+    dbname    : str
+        The database file name.
+    clan_tags : list of str
+        Tags of the registered clans.
+
+    Returns
+    -------
+    clans : list of tuple(str, str or None, datetime.datetime or None)
+        The tag, name and last update of every clan, sorted by name.
+    '''
+    rows = {row[0]: row for row in _read(
+        dbname, 'SELECT clan_tag, name, updated FROM {}'.format(CLAN_TABLE))}
+    clans = []
+    for clan_tag in dict.fromkeys(clan_tags):
+        tag, name, updated = rows.get(clan_tag, (clan_tag, None, None))
+        clans.append((tag, name, _parse_timestamp(updated)))
+    return sorted(clans, key=lambda clan: ((clan[1] or '').lower(), clan[0]))
+
+
+def format_age(updated, now=None):
+    ''' Format how long ago an entry was updated, e.g. '3d ago'.
+    '''
+    if updated is None:
+        return 'never refreshed'
+    seconds = ((now or datetime.datetime.utcnow()) - updated).total_seconds()
+    if seconds < 3600:
+        return '{}m ago'.format(int(seconds // 60))
+    elif seconds < 86400:
+        return '{}h ago'.format(int(seconds // 3600))
+    return '{}d ago'.format(int(seconds // 86400))
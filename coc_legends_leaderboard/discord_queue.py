@@ -0,0 +1,190 @@
+import time
+import asyncio
+import hashlib
+import logging
+
+import discord
+
+from tracing import span
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+def content_hash(content):
+    ''' Hash of the rendered content of a message.
+    '''
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+
+
+class TokenBucket:
+    '''
+    Token bucket of a Discord rate limit bucket.
+
+    Parameters
+    ----------
+    rate : int
+        The number of requests allowed per ``per`` seconds.
+    per  : float
+        The period of the bucket in seconds.
+    '''
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def delay(self):
+        ''' Take a token and return the number of seconds to wait before using it.
+        '''
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.
+        return -self.tokens * self.per / self.rate
+
+    async def acquire(self):
+        delay = self.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class MessageUpdateQueue:
+    '''
+    Queue of message edits and reactions that are sent within Discord's rate limits.
+
+    * Edits of the same message are merged, only the latest content is sent.
+    * Edits whose content is the same as what the message already shows are skipped.
+    * Pending reactions of a message are merged, e.g. adding and removing the same reaction
+      cancel out, and removing the reaction of the same user twice is sent once.
+    * Edits and reactions of each channel are throttled with their own token buckets, so the bot
+      does not stall on 429 responses.
+
+    Parameters
+    ----------
+    debounce       : float, optional, default to 0.25
+        Number of seconds to wait for more updates before sending them.
+    edit_rate      : tuple(int, float), optional, default to (5, 5.)
+        Edits allowed per number of seconds in each channel.
+    reaction_rate  : tuple(int, float), optional, default to (1, 0.25)
+        Reactions allowed per number of seconds in each channel.
+    '''
+
+    def __init__(self, debounce=0.25, edit_rate=(5, 5.), reaction_rate=(1, 0.25)):
+        self.debounce = debounce
+        self.edit_rate = edit_rate
+        self.reaction_rate = reaction_rate
+        self._edits = {}
+        self._reactions = {}
+        self._hashes = {}
+        self._buckets = {}
+        self._wakeup = None
+        self._worker = None
+
+    def start(self):
+        ''' Start sending the updates in the background, must be called within the event loop.
+        '''
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def _bucket(self, kind, channel_id):
+        key = (kind, channel_id)
+        if key not in self._buckets:
+            rate, per = self.edit_rate if kind == 'edit' else self.reaction_rate
+            self._buckets[key] = TokenBucket(rate, per)
+        return self._buckets[key]
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def remember(self, message, content):
+        ''' Remember the content a message was sent with, so unchanged edits are skipped.
+        '''
+        self._hashes[message.id] = content_hash(content)
+
+    def edit(self, message, content):
+        ''' Queue an edit of a message, replacing any pending edit of the same message.
+
+        Parameters
+        ----------
+        message : discord.Message
+            The message to edit.
+        content : str
+            The new content.
+        '''
+        if (message.id not in self._edits) and (self._hashes.get(message.id) == content_hash(content)):
+            return
+        self._edits[message.id] = (message, content)
+        self._notify()
+
+    def _queue_reaction(self, message, action, emoji, user=None):
+        _, actions = self._reactions.setdefault(message.id, (message, {}))
+        key = (emoji, None if user is None else user.id)
+        opposite = 'remove' if action == 'add' else 'add'
+        if actions.get(key, (None, ))[0] == opposite:
+            del actions[key]
+        else:
+            actions[key] = (action, emoji, user)
+        self._notify()
+
+    def add_reactions(self, message, emojis):
+        ''' Queue reactions of the bot to a message.
+        '''
+        for emoji in emojis:
+            self._queue_reaction(message, 'add', emoji)
+
+    def remove_reaction(self, message, emoji, user):
+        ''' Queue the removal of the reaction of a user from a message.
+        '''
+        self._queue_reaction(message, 'remove', emoji, user)
+
+    async def flush(self):
+        ''' Send all the pending updates.
+        '''
+        edits, self._edits = self._edits, {}
+        for message, content in edits.values():
+            digest = content_hash(content)
+            if self._hashes.get(message.id) == digest:
+                continue
+            await self._bucket('edit', message.channel.id).acquire()
+            try:
+                with span('discord.edit'):
+                    await message.edit(content=content)
+                self._hashes[message.id] = digest
+            except discord.HTTPException as error:
+                logging.warning('Failed to edit message {}: {}'.format(message.id, error))
+
+        reactions, self._reactions = self._reactions, {}
+        for message, actions in reactions.values():
+            for action, emoji, user in actions.values():
+                await self._bucket('reaction', message.channel.id).acquire()
+                try:
+                    with span('discord.reaction'):
+                        if action == 'add':
+                            await message.add_reaction(emoji)
+                        else:
+                            await message.remove_reaction(emoji, user)
+                except discord.HTTPException as error:
+                    logging.warning('Failed to {} reaction {} on message {}: {}'.format(
+                        action, emoji, message.id, error))
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # let rapid updates pile up so they are merged
+            await asyncio.sleep(self.debounce)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception('Failed to send message updates.')
@@ -0,0 +1,166 @@
+import os
+import re
+import time
+import threading
+import sqlite3 as sql
+from urllib.parse import urlencode
+
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+class CachedResponse:
+    '''
+    A cached response body with its ETag and expiry.
+
+    Parameters
+    ----------
+    body    : bytes
+        The response body.
+    etag    : str or None
+        The ETag of the response.
+    expires : float
+        The UNIX time after which the response has to be revalidated.
+    '''
+
+    __slots__ = ('body', 'etag', 'expires')
+
+    def __init__(self, body, etag, expires):
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+    def is_fresh(self):
+        return time.time() < self.expires
+
+
+class HttpCache:
+    '''
+    Disk-backed cache of API responses, stored in a SQLite file next to the database.
+
+    The cache survives restarts of the bot. Fresh responses are served without any request,
+    stale responses are revalidated with ``If-None-Match`` and reused on ``304 Not Modified``.
+    New and revalidated responses are kept in memory until ``flush`` writes them in a single
+    transaction, which can run in an executor so the event loop never waits on a commit.
+
+    Parameters
+    ----------
+    filename        : str, optional, default to 'http_cache.db'
+        The SQLite file of the cache, relative to the package directory.
+    default_max_age : float, optional, default to 0
+        Number of seconds a response is fresh if the server does not send ``Cache-Control``.
+    '''
+
+    def __init__(self, filename='http_cache.db', default_max_age=0):
+        self.filename = filename
+        self.default_max_age = default_max_age
+        self._con = None
+        # the database lock is held while writing, the buffer lock only to swap the buffers
+        self._lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        # responses and expiries not written yet, and those being written
+        self._pending = {}
+        self._touched = {}
+        self._flushing = {}
+
+    def _connect(self):
+        if self._con is None:
+            self._con = sql.connect(os.path.join(PATH, self.filename), timeout=30, check_same_thread=False)
+            self._con.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(key TEXT PRIMARY KEY, body BLOB, etag TEXT, expires REAL)')
+            self._con.commit()
+        return self._con
+
+    @staticmethod
+    def make_key(url, params=None):
+        ''' The cache key of a request.
+        '''
+        if not params:
+            return url
+        return url + '?' + urlencode(sorted(params.items()))
+
+    def expires_from_headers(self, headers):
+        ''' The expiry time given by the ``Cache-Control`` header of a response.
+        '''
+        match = re.search(r'max-age=(\d+)', headers.get('Cache-Control', ''))
+        max_age = int(match.group(1)) if match else self.default_max_age
+        return time.time() + max_age
+
+    def get(self, key):
+        ''' Get a cached response.
+
+        The database read waits for a running ``flush``, so it is meant to run in an executor.
+
+        Returns
+        -------
+        response : CachedResponse or None
+            The cached response, None if not cached.
+        '''
+        response = self._pending.get(key) or self._flushing.get(key)
+        if response is not None:
+            return response
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT body, etag, expires FROM responses WHERE key = ?', (key, )).fetchone()
+        if row is None:
+            return None
+        response = CachedResponse(*row)
+        response.expires = self._touched.get(key, response.expires)
+        return response
+
+    def put(self, key, body, etag, expires):
+        ''' Store a response, written on the next ``flush``.
+        '''
+        with self._buffer_lock:
+            self._pending[key] = CachedResponse(body, etag, expires)
+            self._touched.pop(key, None)
+
+    def touch(self, key, expires):
+        ''' Extend the expiry of a revalidated response, written on the next ``flush``.
+        '''
+        with self._buffer_lock:
+            if key in self._pending:
+                self._pending[key].expires = expires
+            else:
+                self._touched[key] = expires
+
+    def flush(self):
+        ''' Write the pending responses and expiries in one transaction.
+
+        Returns
+        -------
+        written : int
+            The number of responses written.
+        '''
+        with self._buffer_lock:
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched, {}
+            rows = [(key, response.body, response.etag, response.expires) for key, response in pending.items()]
+            self._flushing = pending
+        if not (rows or touched):
+            return 0
+        try:
+            with self._lock:
+                con = self._connect()
+                with con:
+                    con.executemany('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)', rows)
+                    con.executemany('UPDATE responses SET expires = ? WHERE key = ?',
+                                    [(expires, key) for key, expires in touched.items()])
+        finally:
+            self._flushing = {}
+        return len(rows) + len(touched)
+
+    def purge(self, older_than):
+        ''' Remove responses that expired more than ``older_than`` seconds ago.
+        '''
+        with self._lock:
+            con = self._connect()
+            with con:
+                con.execute('DELETE FROM responses WHERE expires < ?', (time.time() - older_than, ))
+
+    def close(self):
+        self.flush()
+        if self._con is not None:
+            self._con.close()
+            self._con = None
@@ -0,0 +1,57 @@
+import json
+import logging
+
+
+_BACKENDS = {
+    'json': json.loads,
+}
+
+try:
+    import ujson
+    _BACKENDS['ujson'] = ujson.loads
+except ImportError:
+    pass
+
+try:
+    import orjson
+    _BACKENDS['orjson'] = orjson.loads
+except ImportError:
+    pass
+
+
+# the fastest available backend is used by default
+_backend = next(name for name in ('orjson', 'ujson', 'json') if name in _BACKENDS)
+
+
+def available_backends():
+    ''' Names of the JSON backends that can be used.
+    '''
+    return sorted(_BACKENDS)
+
+
+def get_backend():
+    ''' Name of the JSON backend in use.
+    '''
+    return _backend
+
+
+def set_backend(name):
+    ''' Select the JSON backend used to decode API responses.
+
+    Parameters
+    ----------
+    name : str
+        One of ``available_backends()``, e.g. 'orjson', 'ujson' or 'json'.
+    '''
+    global _backend
+    if name not in _BACKENDS:
+        raise ValueError('JSON backend {} is not available, choose from {}.'.format(
+            name, ', '.join(available_backends())))
+    logging.info('Using {} to decode JSON.'.format(name))
+    _backend = name
+
+
+def loads(data):
+    ''' Decode JSON data (bytes or str) with the selected backend.
+    '''
+    return _BACKENDS[_backend](data)
@@ -1,5 +1,6 @@
 import os
 import math
+import asyncio
 import logging
 import calendar
 import datetime
@@ -7,11 +8,21 @@ import pandas as pd
 import sqlite3 as sql
 from dotenv import load_dotenv
 
+import directory
 from coc import ClashOfClans
+from http_cache import HttpCache
+from player_snapshots import PlayerSnapshotStore
+from snapshot import remove_snapshot, save_snapshot
+from tracing import traced
+from sharded_refresh import sharded_refresh
 
 
 logging.basicConfig(level=logging.INFO)
 PATH = os.path.dirname(os.path.abspath(__file__))
+HISTORY_TABLE = 'leaderboard_history'
+
+# callbacks notified after a leaderboard is saved
+_leaderboard_subscribers = []
 
 
 def get_last_monday_of_month(year, month):
@@ -86,16 +97,35 @@ class LegendsLeagueLeaderboard:
 
     Parameters
     ----------
-    filename : the file to 
+    filename        : the file to 
+    api_token       : str
+        The API token for authentication.
+    refresh_workers : int, optional, default to 0
+        If larger than 1, the current season leaderboard is refreshed by this number of worker
+        processes, see ``sharded_refresh.sharded_refresh``.
+    http_cache      : bool, optional, default to True
+        Whether to cache the API responses on disk in ``http_cache.db``.
+    player_snapshots : bool, optional, default to False
+        Whether to keep the full payloads of the refreshed players in ``player_snapshots.db``,
+        see ``player_snapshots.PlayerSnapshotStore``. Not supported by the sharded refresh.
     '''
 
     dbname = "database.db"
+    rank_index_ttl = datetime.timedelta(hours=1)
 
-    def __init__(self, filename, api_token):
+    def __init__(self, filename, api_token, refresh_workers=0, http_cache=True, player_snapshots=False):
         self.filename = filename
-        self.coc = ClashOfClans(api_token=api_token)
+        self.coc = ClashOfClans(api_token=api_token, http_cache=HttpCache() if http_cache else None)
+        self.refresh_workers = refresh_workers
+        self.player_snapshots = PlayerSnapshotStore() if player_snapshots else None
         self.player_tags = []
         self.qualified_clans = []
+        self.flagged_players = []
+        # player tag -> discord user id of the verified owner
+        self.linked_accounts = {}
+        self._rank_indices = {}
+        # keys of the season indices that stopped at the last player looked for
+        self._partial_rank_indices = set()
 
     def __enter__(self):
         self.load_player_tags()
@@ -106,6 +136,21 @@ class LegendsLeagueLeaderboard:
         self.save_player_tags()
         self.save_qualified_clans()
 
+    async def record_player_snapshots(self, players, timestamp=None):
+        ''' Store the raw payloads of refreshed players, in an executor.
+        '''
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.player_snapshots.record_many, players, timestamp)
+
+    async def flush_http_cache(self):
+        ''' Write the cached API responses of a refresh to disk, in an executor.
+        '''
+        http_cache = getattr(self.coc, 'http_cache', None)
+        if http_cache is None:
+            return
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, http_cache.flush)
+
     def load_player_tags(self):
         ''' Load player tags from database.
         '''
@@ -140,13 +185,141 @@ class LegendsLeagueLeaderboard:
         with sql.connect(os.path.join(PATH, self.dbname)) as con:
             data.to_sql("qualified_clans", con=con, if_exists='replace')
 
-    async def register_players(self, player_tags):
+    def load_flagged_players(self):
+        ''' Load tags of players flagged for leaving the qualified clans from database.
+        '''
+        with sql.connect(os.path.join(PATH, self.dbname)) as con:
+            try:
+                data = pd.read_sql("SELECT * FROM flagged_players", con=con).set_index('index')
+                self.flagged_players = data.squeeze(axis=1).to_list()
+            except pd.io.sql.DatabaseError:
+                self.flagged_players = []
+
+    def load_linked_accounts(self):
+        ''' Load the player tags linked to discord users from database.
+        '''
+        with sql.connect(os.path.join(PATH, self.dbname)) as con:
+            try:
+                data = pd.read_sql("SELECT player_tag, discord_id FROM linked_accounts", con=con)
+                self.linked_accounts = dict(zip(data['player_tag'], data['discord_id']))
+            except pd.io.sql.DatabaseError:
+                self.linked_accounts = {}
+
+    def save_linked_accounts(self):
+        ''' Save the player tags linked to discord users into database.
+        '''
+        data = pd.DataFrame({
+            'player_tag': list(self.linked_accounts),
+            'discord_id': list(self.linked_accounts.values()),
+        }, dtype=str)
+        with sql.connect(os.path.join(PATH, self.dbname)) as con:
+            data.to_sql("linked_accounts", con=con, if_exists='replace', index=False)
+            con.execute('CREATE UNIQUE INDEX IF NOT EXISTS ix_linked_accounts_player_tag '
+                        'ON linked_accounts (player_tag)')
+            con.execute('CREATE INDEX IF NOT EXISTS ix_linked_accounts_discord_id '
+                        'ON linked_accounts (discord_id)')
+
+    def link_accounts(self, discord_id, player_tags):
+        ''' Link verified player tags to a discord user, replacing their previous owners.
+
+        Parameters
+        ----------
+        discord_id  : int or str
+            The discord user id.
+        player_tags : list of str
+            Tags of players verified by the user.
+        '''
+        for player_tag in player_tags:
+            self.linked_accounts[player_tag.upper()] = str(discord_id)
+        self.save_linked_accounts()
+
+    def get_linked_players(self, discord_id):
+        ''' Tags of players linked to a discord user.
+        '''
+        return [player_tag for player_tag, owner in self.linked_accounts.items() if owner == str(discord_id)]
+
+    def is_owner(self, player_tag, discord_id):
+        ''' Whether a discord user may manage a player, i.e. the player is not linked to another user.
+        '''
+        owner = self.linked_accounts.get(player_tag.upper())
+        return (owner is None) or (owner == str(discord_id))
+
+    def apply_roster_changes(self, joined, left, remove_leavers=False):
+        ''' Apply the membership changes of the qualified clans to the roster in one batch.
+
+        Parameters
+        ----------
+        joined         : dict(str, str)
+            Tags and names of players that joined the qualified clans, they are registered and
+            recorded in the name directory.
+        left           : dict(str, str)
+            Tags and names of players that left the qualified clans.
+        remove_leavers : bool, optional, default to False
+            If True, the registered leavers are removed, otherwise they are flagged.
+
+        Returns
+        -------
+        added   : list of str
+            Tags of players that are registered.
+        removed : list of str
+            Tags of players that are removed.
+        flagged : list of str
+            Tags of players that are flagged.
+        '''
+        # the clans of the joiners are not known here, the recorded ones are kept
+        directory.update_players(self.dbname, [{'tag': player_tag, 'name': name}
+                                               for player_tag, name in joined.items()])
+        added = [player_tag for player_tag in joined if player_tag not in self.player_tags]
+        leavers = set(left).intersection(self.player_tags)
+        removed = []
+        flagged = []
+        if remove_leavers:
+            removed = [player_tag for player_tag in self.player_tags if player_tag in leavers]
+        else:
+            flagged = [player_tag for player_tag in self.player_tags
+                       if player_tag in leavers and player_tag not in self.flagged_players]
+        # players who came back are no longer flagged
+        unflagged = set(joined).union(removed).intersection(self.flagged_players)
+        if not (added or removed or flagged or unflagged):
+            return added, removed, flagged
+
+        player_tags = [player_tag for player_tag in self.player_tags if player_tag not in leavers] \
+            if remove_leavers else list(self.player_tags)
+        player_tags.extend(added)
+        flagged_players = [player_tag for player_tag in self.flagged_players
+                           if player_tag not in unflagged] + flagged
+        # both lists are replaced in one transaction, a failure keeps the old roster
+        con = sql.connect(os.path.join(PATH, self.dbname), isolation_level=None)
+        try:
+            con.execute('BEGIN IMMEDIATE')
+            try:
+                _replace_tag_table(con, 'player_tags', player_tags)
+                _replace_tag_table(con, 'flagged_players', flagged_players)
+                con.execute('COMMIT')
+            except Exception:
+                con.execute('ROLLBACK')
+                raise
+        finally:
+            con.close()
+        self.player_tags, self.flagged_players = player_tags, flagged_players
+        for player_tag in added:
+            logging.info("Registered player {} who joined a qualified clan.".format(player_tag))
+        for player_tag in removed:
+            logging.info("Removed player {} who left the qualified clans.".format(player_tag))
+        for player_tag in flagged:
+            logging.warning("Player {} left the qualified clans.".format(player_tag))
+        return added, removed, flagged
+
+    async def register_players(self, player_tags, owner=None):
         ''' Register players for the leaderboard.
 
         Parameters
         ----------
         player_tags : list of str
             Tags of players to register.
+        owner       : int or str, optional, default to None
+            If given, the discord user id registering the players. Players linked to another
+            user fail to register.
 
         Returns
         -------
@@ -161,9 +334,20 @@ class LegendsLeagueLeaderboard:
         successful_players = {}
         unqualified_players = {}
         failed_tags = []
+        seen_players = []
         for player_tag in player_tags:
+            if (owner is not None) and not self.is_owner(player_tag, owner):
+                logging.warning("Player {} is linked to another user.".format(player_tag))
+                failed_tags.append(player_tag)
+                continue
             try:
                 player = await self.coc.get_player_info(player_tag)
+                seen_players.append({
+                    'tag': player['tag'],
+                    'name': player['name'],
+                    'clan_tag': player.get('clan', {}).get('tag'),
+                    'clan_name': player.get('clan', {}).get('name'),
+                })
                 if (not self.qualified_clans) or (player['clan']['tag'] in self.qualified_clans):
                     successful_players[player['tag']] = player['name']
                     self.player_tags.append(player['tag'])
@@ -173,18 +357,25 @@ class LegendsLeagueLeaderboard:
             except RuntimeError:
                 failed_tags.append(player_tag)
         self.save_player_tags()
+        directory.update_players(self.dbname, seen_players)
         return successful_players, unqualified_players, failed_tags
 
-    def remove_players(self, player_tags):
+    def remove_players(self, player_tags, owner=None):
         ''' Remove players.
 
         Parameters
         ----------
         player_tags : list of str
             Tags of players to register.
+        owner       : int or str, optional, default to None
+            If given, the discord user id removing the players. Players linked to another user
+            are not removed.
         '''
         removed_players = []
         for player_tag in player_tags:
+            if (owner is not None) and not self.is_owner(player_tag, owner):
+                logging.warning("Player {} is linked to another user, not removed.".format(player_tag))
+                continue
             if player_tag in self.player_tags:
                 index = self.player_tags.index(player_tag)
                 logging.info("Successfully removed player: {}".format(self.player_tags.pop(index)))
@@ -198,6 +389,7 @@ class LegendsLeagueLeaderboard:
         try:
             clan_info = await self.coc.get_clan_info(clan_tag)
             self.qualified_clans.append(clan_info['tag'])
+            directory.update_clans(self.dbname, [clan_info])
             logging.info("Added clan {} into qualified clans.",format(clan_info['name']))
             self.save_qualified_clans()
             return True
@@ -220,6 +412,116 @@ class LegendsLeagueLeaderboard:
             return True
         return False
 
+    @staticmethod
+    def _rank_index_key(location_id, season_id):
+        if season_id is not None:
+            return ('season', season_id)
+        return ('location', str(location_id))
+
+    async def _fetch_rank_index(self, location_id, season_id, limit, player_tags=None):
+        key = self._rank_index_key(location_id, season_id)
+        if season_id is not None:
+            rankings = await self.coc.get_legend_season_rankings(season_id, limit=limit, player_tags=player_tags)
+            # rankings of a closed season never change
+            expiry = None
+        else:
+            rankings = await self.coc.get_location_player_rankings(location_id, limit=limit)
+            expiry = datetime.datetime.utcnow() + self.rank_index_ttl
+        index = {player['tag']: player['rank'] for player in rankings}
+        self._rank_indices[key] = (expiry, index)
+        # the pages stop early only if all the players were found
+        if (season_id is not None) and (player_tags is not None) and index.keys() >= set(player_tags):
+            self._partial_rank_indices.add(key)
+        else:
+            self._partial_rank_indices.discard(key)
+        return index
+
+    def get_cached_rank_index(self, location_id='global', season_id=None):
+        ''' Get a cached tag to rank index, without any API request.
+
+        Parameters
+        ----------
+        location_id : int or str, optional, default to 'global'
+            The location of the rankings. Ignored if ``season_id`` is given.
+        season_id   : str, optional, default to None
+            If given, use the rankings of this closed Legend League season.
+
+        Returns
+        -------
+        index : dict(str, int) or None
+            The dictionary of player tags and ranks, None if not cached or expired.
+        '''
+        expiry, index = self._rank_indices.get(
+            self._rank_index_key(location_id, season_id), (None, None))
+        if (expiry is not None) and (expiry < datetime.datetime.utcnow()):
+            return None
+        return index
+
+    async def update_rank_indices(self, location_ids=('global', ), season_id=None, limit=None, refresh=False,
+                                  player_tags=None):
+        ''' Update the tag to rank indices from the ranking endpoints.
+
+        The rankings of all the locations are fetched concurrently. Indices that are still cached
+        are not fetched again unless ``refresh`` is True.
+
+        Parameters
+        ----------
+        location_ids : list of int or str, optional, default to ('global', )
+            The locations of the rankings. Ignored if ``season_id`` is given.
+        season_id    : str, optional, default to None
+            If given, fetch the rankings of this closed Legend League season instead.
+        limit        : int, optional, default to None
+            The maximum number of ranked players to fetch for each index.
+        refresh      : bool, optional, default to False
+            Whether to fetch the rankings even if the indices are cached.
+        player_tags  : list of str, optional, default to None
+            If given with ``season_id``, only fetch the season rankings until all these players
+            are found, instead of the whole season.
+
+        Returns
+        -------
+        indices : list of dict(str, int)
+            The tag to rank indices, in the same order as ``location_ids``.
+        '''
+        if season_id is not None:
+            location_ids = [None]
+        else:
+            player_tags = None
+
+        async def get_index(location_id):
+            index = None if refresh else self.get_cached_rank_index(location_id, season_id)
+            key = self._rank_index_key(location_id, season_id)
+            if (index is not None) and (key in self._partial_rank_indices) \
+                    and not ((player_tags is not None) and index.keys() >= set(player_tags)):
+                # a partial index may miss players that were not looked for
+                index = None
+            if index is None:
+                logging.info('Fetching rankings for {}.'.format(key))
+                index = await self._fetch_rank_index(location_id, season_id, limit, player_tags)
+            return index
+
+        return await asyncio.gather(*[get_index(location_id) for location_id in location_ids])
+
+    def join_ranks(self, data, location_id='global', season_id=None):
+        ''' Add the cached rankings to the leaderboard as the ``location_rank`` column.
+
+        Parameters
+        ----------
+        data        : pandas.DataFrame
+            A Pandas DataFrame of the leaderboard.
+        location_id : int or str, optional, default to 'global'
+            The location of the rankings. Ignored if ``season_id`` is given.
+        season_id   : str, optional, default to None
+            If given, use the rankings of this closed Legend League season.
+
+        Returns
+        -------
+        data : pandas.DataFrame
+            The leaderboard with ranks, players that are not ranked have missing ranks.
+        '''
+        index = self.get_cached_rank_index(location_id, season_id) or {}
+        return data.assign(location_rank=data['player_tag'].map(index).astype('Int64'))
+
     def _get_legends_day_cutoff(self, year, month):
         last_monday_this_month = get_last_monday_of_month(year, month)
 
@@ -269,21 +571,21 @@ class LegendsLeagueLeaderboard:
         logging.info('Last season is: {}'.format(last_season))
 
         for player_tag in self.player_tags:
-            player_info = await self.coc.get_player_info(player_tag)
-            if ('legendStatistics' not in player_info) \
-                    or ('previousSeason' not in player_info['legendStatistics']) \
-                    or (player_info['legendStatistics']['previousSeason']['id'] != last_season):
+            player = await self.coc.get_player(player_tag, keep_raw=False)
+            if (player.legend_statistics is None) \
+                    or (player.legend_statistics.previous_season_id != last_season):
                 # player is not in legend league
                 logging.warning('Player {player_tag} not in Legend League last season, skip.'.format(
                     player_tag=player_tag))
             else:
                 # player is in legend league
                 legend_player_trophies.append(
-                    player_info['legendStatistics']['previousSeason']['trophies'])
-                legend_player_names.append(player_info['name'])
-                legend_player_tags.append(player_info['tag'])
+                    player.legend_statistics.previous_season_trophies)
+                legend_player_names.append(player.name)
+                legend_player_tags.append(player.tag)
         return legend_player_tags, legend_player_names, legend_player_trophies
 
+    @traced()
     async def get_last_season_trophies(self):
         '''
         Get last season legend leaderboard.
@@ -308,22 +610,47 @@ class LegendsLeagueLeaderboard:
         legend_player_trophies = []
         legend_player_names = []
         legend_player_tags = []
+        legend_player_attack_wins = []
+        legend_player_defense_wins = []
 
         legend_id = 29000022
+        keep_raw = self.player_snapshots is not None
+        raw_players = []
+        seen_players = []
 
         for player_tag in self.player_tags:
-            player_info = await self.coc.get_player_info(player_tag)
-            if not player_info.get('league', {}).get('id', 0) == legend_id:
+            player = await self.coc.get_player(player_tag, keep_raw=keep_raw)
+            seen_players.append(player)
+            if keep_raw:
+                raw_players.append(player.raw)
+            if not player.league_id == legend_id:
                 # player is not in legend league
                 logging.warning('Player {player_tag} not in Legend League, skip.'.format(
                     player_tag=player_tag))
             else:
                 # player is in legend league
-                legend_player_trophies.append(player_info['trophies'])
-                legend_player_names.append(player_info['name'])
-                legend_player_tags.append(player_info['tag'])
-        return legend_player_tags, legend_player_names, legend_player_trophies
-
+                legend_player_trophies.append(player.trophies)
+                legend_player_names.append(player.name)
+                legend_player_tags.append(player.tag)
+                legend_player_attack_wins.append(player.attack_wins)
+                legend_player_defense_wins.append(player.defense_wins)
+        if raw_players:
+            await self.record_player_snapshots(raw_players)
+        directory.update_players(self.dbname, seen_players)
+        return legend_player_tags, legend_player_names, legend_player_trophies, \
+            legend_player_attack_wins, legend_player_defense_wins
+
+    async def _get_current_season_trophies_sharded(self):
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(
+            None, sharded_refresh, self.coc.api_token, list(self.player_tags), self.refresh_workers)
+        if not rows:
+            return [], [], [], [], []
+        # the workers only return the names, the clans in the directory are kept
+        directory.update_players(self.dbname, [{'tag': row[0], 'name': row[1]} for row in rows])
+        return tuple(map(list, zip(*rows)))
+
+    @traced()
     async def get_current_season_trophies(self):
         '''
         Get current season legend leaderboard.
@@ -333,15 +660,90 @@ class LegendsLeagueLeaderboard:
         dataframe  :  pandas.DataFrame
             A Pandas DataFrame of the current season leaderboard, sorted.
         '''
-        legend_player_tags, legend_player_names, legend_player_trophies = await self._get_current_season_trophies()
+        if self.refresh_workers > 1:
+            collect = self._get_current_season_trophies_sharded
+        else:
+            collect = self._get_current_season_trophies
+        legend_player_tags, legend_player_names, legend_player_trophies, \
+            legend_player_attack_wins, legend_player_defense_wins = await collect()
+        await self.flush_http_cache()
         dataframe = pd.DataFrame({
             'player_tag': legend_player_tags,
             'name': legend_player_names,
             'trophies': legend_player_trophies,
+            'attack_wins': legend_player_attack_wins,
+            'defense_wins': legend_player_defense_wins,
             'timestamp': datetime.datetime.utcnow(),
         })
         return dataframe.sort_values(by='trophies', ascending=False).reset_index(drop=True)
 
+    @traced()
+    async def poll_scheduled_trophies(self, scheduler, data):
+        '''
+        Refresh the players that are due according to the polling scheduler.
+
+        Only the due players are requested, concurrently, and merged into the current season
+        leaderboard. The polled players are then rescheduled from their new trophies and ranks.
+
+        Parameters
+        ----------
+        scheduler : scheduler.AdaptivePollScheduler
+            The polling scheduler.
+        data      : pandas.DataFrame
+            A Pandas DataFrame of the current season leaderboard to update.
+
+        Returns
+        -------
+        dataframe : pandas.DataFrame
+            A Pandas DataFrame of the updated current season leaderboard, sorted.
+        polled    : pandas.DataFrame
+            A Pandas DataFrame of the legend players that were polled.
+        '''
+        columns = ['player_tag', 'name', 'trophies', 'attack_wins', 'defense_wins', 'timestamp']
+        scheduler.sync(self.player_tags)
+        player_tags = scheduler.due()
+        keep_raw = self.player_snapshots is not None
+        players = await asyncio.gather(
+            *[self.coc.get_player(player_tag, keep_raw=keep_raw) for player_tag in player_tags],
+            return_exceptions=True)
+        await self.flush_http_cache()
+        timestamp = datetime.datetime.utcnow()
+        seen_players = [player for player in players if not isinstance(player, Exception)]
+        if keep_raw:
+            await self.record_player_snapshots([player.raw for player in seen_players], timestamp)
+        directory.update_players(self.dbname, seen_players, timestamp)
+
+        rows = []
+        not_legend_tags = []
+        for player_tag, player in zip(player_tags, players):
+            if isinstance(player, Exception):
+                logging.warning('Failed to poll player {}: {}'.format(player_tag, player))
+                scheduler.defer(player_tag)
+            elif not player.league_id == self.coc.legend_league_id:
+                not_legend_tags.append(player_tag)
+                scheduler.update(player_tag, player.trophies, in_legend=False)
+            else:
+                rows.append({
+                    'player_tag': player.tag,
+                    'name': player.name,
+                    'trophies': player.trophies,
+                    'attack_wins': player.attack_wins,
+                    'defense_wins': player.defense_wins,
+                    'timestamp': timestamp,
+                })
+        polled = pd.DataFrame(rows, columns=columns)
+
+        keep = data['player_tag'].isin(self.player_tags) \
+            & ~data['player_tag'].isin(not_legend_tags) \
+            & ~data['player_tag'].isin(polled['player_tag'])
+        dataframe = pd.concat([data.loc[keep], polled], ignore_index=True) \
+            .sort_values(by='trophies', ascending=False).reset_index(drop=True)
+
+        ranks = pd.Series(dataframe.index + 1, index=dataframe['player_tag'])
+        for player_tag, trophies in zip(polled['player_tag'], polled['trophies']):
+            scheduler.update(player_tag, trophies, rank=ranks[player_tag])
+        return dataframe, polled
+
 
 def format_timedelta(timedelta, seconds=True, hms=True):
     hours, remainder = divmod(timedelta.seconds, 3600)
@@ -362,6 +764,7 @@ def format_leaderboard_title(season):
     return 'Legend League Leaderboard for {season} Season'.format(season=season)
 
 
+@traced()
 def format_leaderboard(
     data,
     title,
@@ -371,6 +774,7 @@ def format_leaderboard(
     season_countdown=None,
     separator='-',
     center=False,
+    changes=None,
 ):
     '''
     Format the leaderboad data into text for discord post.
@@ -378,7 +782,8 @@ def format_leaderboard(
     Parameters
     ----------
     data : pandas.DataFrame
-        A Pandas DataFrame of the leaderboard.
+        A Pandas DataFrame of the leaderboard. If it has a ``location_rank`` column, the ranks
+        are shown next to the trophies.
     title : str
         The title of the leaderboard.
     page_no : int, optional, default to 0
@@ -393,6 +798,8 @@ def format_leaderboard(
         The line separator.
     center           : bool, optional, default to False
         Whether to center each line.
+    changes          : rank_diff.RankChanges, optional, default to None
+        If given, the rank movements of the last refresh are shown next to the players.
     '''
     nlines = len(data)
     line_format = '{{rank:>{index_pad}}}. {{name:{name_pad}}} {gap} 🏆 {{trophies:>4}}'.format(
@@ -410,6 +817,7 @@ def format_leaderboard(
         title.center(linewidth) if center else title,
         separator * linewidth,
     ]
+    show_location_ranks = 'location_rank' in data.columns
     for index, line in data.iloc[page_no * max_lines: (page_no + 1) * max_lines].T.items():
         rank = index + 1  # start rank with 1
         line_content = line_format.format(
@@ -417,6 +825,12 @@ def format_leaderboard(
             name=line['name'],
             trophies=line['trophies'],
         )
+        if show_location_ranks and not pd.isna(line['location_rank']):
+            line_content += ' (#{})'.format(line['location_rank'])
+        if changes is not None:
+            movement = changes.format_movement(line['player_tag'])
+            if movement:
+                line_content += ' ' + movement
         #  if center:
         #    line_content = line_content.center(linewidth)
         content.append(line_content)
@@ -435,14 +849,119 @@ def format_leaderboard(
     return '```\n{}\n```'.format('\n'.join(content))
 
 
-def save_leaderboard(dbname, data, season):
+def _replace_tag_table(con, table, tags):
+    ''' Replace a table of tags, with the same layout as ``pandas.Series.to_sql``.
+
+    Unlike ``to_sql``, nothing is committed, so several tables can be replaced in one transaction.
+    '''
+    con.execute('DROP TABLE IF EXISTS "{}"'.format(table))
+    con.execute('CREATE TABLE "{}" ("index" INTEGER, "0" TEXT)'.format(table))
+    con.execute('CREATE INDEX "ix_{table}_index" ON "{table}" ("index")'.format(table=table))
+    con.executemany('INSERT INTO "{}" VALUES (?, ?)'.format(table), enumerate(tags))
+
+
+def _append_history(con, data, season):
+    ''' Append a leaderboard snapshot to the history table.
+
+    Columns that are present in ``data`` but not yet in the history table are added on the fly,
+    so the history table can grow together with the leaderboard snapshots.
+
+    Parameters
+    ----------
+    con    : sqlite3.Connection
+        The database connection.
+    data   : pandas.DataFrame
+        A Pandas DataFrame of the leaderboard.
+    season : str
+        The season of the leaderboard, e.g. '2021-03'.
+    '''
+    history = data.assign(season=season)
+    columns = [row[1] for row in con.execute(
+        'PRAGMA table_info({})'.format(HISTORY_TABLE))]
+    if columns:
+        for column in history.columns:
+            if column not in columns:
+                con.execute('ALTER TABLE {} ADD COLUMN "{}"'.format(HISTORY_TABLE, column))
+    history.to_sql(HISTORY_TABLE, con=con, if_exists='append', index=False)
+    con.execute('CREATE INDEX IF NOT EXISTS ix_{table}_season_tag ON {table} (season, player_tag)'.format(
+        table=HISTORY_TABLE))
+
+
+def subscribe_leaderboard(callback):
+    ''' Register a callback that is called every time a leaderboard is saved.
+
+    The callback is called as ``callback(data, season)`` after the leaderboard is committed
+    into the database. Can be used as a decorator.
+
+    Parameters
+    ----------
+    callback : callable
+        The callback.
+    '''
+    _leaderboard_subscribers.append(callback)
+    return callback
+
+
+def unsubscribe_leaderboard(callback):
+    ''' Remove a callback registered with ``subscribe_leaderboard``.
+    '''
+    if callback in _leaderboard_subscribers:
+        _leaderboard_subscribers.remove(callback)
+
+
+def _publish_leaderboard(data, season):
+    for callback in list(_leaderboard_subscribers):
+        try:
+            callback(data, season)
+        except Exception:
+            logging.exception('Leaderboard subscriber {} failed.'.format(callback))
+
+
+@traced()
+def save_leaderboard(dbname, data, season, history=None):
     ''' Save leaderboard data into database.
+
+    Besides replacing the current leaderboard, every snapshot is also appended to the
+    ``leaderboard_history`` table, which is later compacted into per-season archives.
+    A binary snapshot is written next to the database for fast startup, see ``snapshot``.
+    Once committed, the subscribers of ``subscribe_leaderboard`` are notified.
+
+    Parameters
+    ----------
+    dbname  : str
+        The database file name.
+    data    : pandas.DataFrame
+        A Pandas DataFrame of the leaderboard.
+    season  : str
+        The season of the leaderboard.
+    history : pandas.DataFrame, optional, default to None
+        The rows to append to the history. If None, the whole leaderboard is appended.
     '''
     with sql.connect(os.path.join(PATH, dbname)) as con:
         data.to_sql('leaderboard', con=con, if_exists='replace')
         pd.Series(season).to_sql('season', con=con, if_exists='replace')
+        _append_history(con, data if history is None else history, season)
+    try:
+        save_snapshot(dbname, data, season)
+    except Exception as error:
+        logging.warning('Failed to save leaderboard snapshot: {}'.format(error))
+        # the stale snapshot would be loaded instead of the database on the next start
+        remove_snapshot(dbname)
+    _publish_leaderboard(data, season)
+
+
+def empty_leaderboard():
+    ''' An empty leaderboard.
+    '''
+    return pd.DataFrame({
+        'player_tag': pd.Series([], dtype=str),
+        'name': pd.Series([], dtype=str),
+        'trophies': pd.Series([], dtype=int),
+        'timestamp': pd.Series([], dtype='datetime64[ns]'),
+    })
 
 
+@traced()
 def load_leaderboard(dbname):
     ''' Load leaderboard from database.
     '''
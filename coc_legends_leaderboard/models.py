@@ -0,0 +1,205 @@
+import json_backend
+
+
+class ClanRef:
+    '''
+    Reference to the clan of a player.
+
+    Parameters
+    ----------
+    tag  : str
+        The clan tag.
+    name : str
+        The clan name.
+    '''
+
+    __slots__ = ('tag', 'name')
+
+    def __init__(self, tag, name):
+        self.tag = tag
+        self.name = name
+
+    def __repr__(self):
+        return 'ClanRef({!r}, {!r})'.format(self.tag, self.name)
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return None
+        return cls(data['tag'], data.get('name'))
+
+
+class LegendStats:
+    '''
+    Legend League statistics of a player.
+
+    Parameters
+    ----------
+    legend_trophies           : int
+        The legend trophies of the player.
+    previous_season_id        : str or None
+        The id of the previous legend season of the player, e.g. '2021-03'.
+    previous_season_trophies  : int or None
+        The end-of-season trophies of the previous legend season.
+    previous_season_rank      : int or None
+        The end-of-season global rank of the previous legend season.
+    best_season_id            : str or None
+        The id of the best legend season of the player.
+    best_season_trophies      : int or None
+        The end-of-season trophies of the best legend season.
+    '''
+
+    __slots__ = (
+        'legend_trophies',
+        'previous_season_id',
+        'previous_season_trophies',
+        'previous_season_rank',
+        'best_season_id',
+        'best_season_trophies',
+    )
+
+    def __init__(
+        self,
+        legend_trophies,
+        previous_season_id=None,
+        previous_season_trophies=None,
+        previous_season_rank=None,
+        best_season_id=None,
+        best_season_trophies=None,
+    ):
+        self.legend_trophies = legend_trophies
+        self.previous_season_id = previous_season_id
+        self.previous_season_trophies = previous_season_trophies
+        self.previous_season_rank = previous_season_rank
+        self.best_season_id = best_season_id
+        self.best_season_trophies = best_season_trophies
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return None
+        previous_season = data.get('previousSeason', {})
+        best_season = data.get('bestSeason', {})
+        return cls(
+            legend_trophies=data.get('legendTrophies', 0),
+            previous_season_id=previous_season.get('id'),
+            previous_season_trophies=previous_season.get('trophies'),
+            previous_season_rank=previous_season.get('rank'),
+            best_season_id=best_season.get('id'),
+            best_season_trophies=best_season.get('trophies'),
+        )
+
+
+class Player:
+    '''
+    Compact player model with only the fields used by the leaderboard.
+
+    The rest of the payload (troops, spells, heroes, achievements, ...) is kept as the raw JSON
+    bytes and only decoded when ``to_dict`` is called.
+
+    Parameters
+    ----------
+    tag                : str
+        The player tag.
+    name               : str
+        The player name.
+    trophies           : int
+        The current trophies.
+    league_id          : int or None
+        The id of the current league.
+    attack_wins        : int
+        The number of attacks won this season.
+    defense_wins       : int
+        The number of defenses won this season.
+    clan               : ClanRef or None
+        The clan of the player.
+    legend_statistics  : LegendStats or None
+        The Legend League statistics of the player.
+    raw                : bytes, optional, default to None
+        The raw JSON payload.
+    '''
+
+    __slots__ = (
+        'tag',
+        'name',
+        'trophies',
+        'league_id',
+        'attack_wins',
+        'defense_wins',
+        'clan',
+        'legend_statistics',
+        'raw',
+    )
+
+    def __init__(
+        self,
+        tag,
+        name,
+        trophies,
+        league_id=None,
+        attack_wins=0,
+        defense_wins=0,
+        clan=None,
+        legend_statistics=None,
+        raw=None,
+    ):
+        self.tag = tag
+        self.name = name
+        self.trophies = trophies
+        self.league_id = league_id
+        self.attack_wins = attack_wins
+        self.defense_wins = defense_wins
+        self.clan = clan
+        self.legend_statistics = legend_statistics
+        self.raw = raw
+
+    def __repr__(self):
+        return 'Player({!r}, {!r}, trophies={!r})'.format(self.tag, self.name, self.trophies)
+
+    @classmethod
+    def from_dict(cls, data, raw=None):
+        ''' Project the player payload onto the model fields.
+
+        Parameters
+        ----------
+        data : dict
+            The decoded player payload.
+        raw  : bytes, optional, default to None
+            The raw JSON payload, kept for ``to_dict``.
+        '''
+        return cls(
+            tag=data['tag'],
+            name=data['name'],
+            trophies=data['trophies'],
+            league_id=data.get('league', {}).get('id'),
+            attack_wins=data.get('attackWins', 0),
+            defense_wins=data.get('defenseWins', 0),
+            clan=ClanRef.from_dict(data.get('clan')),
+            legend_statistics=LegendStats.from_dict(data.get('legendStatistics')),
+            raw=raw,
+        )
+
+    @classmethod
+    def from_json(cls, raw, keep_raw=True):
+        ''' Decode a raw player payload into the model.
+
+        Parameters
+        ----------
+        raw      : bytes
+            The raw JSON payload.
+        keep_raw : bool, optional, default to True
+            Whether to keep the raw payload, which is needed by ``to_dict``.
+        '''
+        return cls.from_dict(json_backend.loads(raw), raw=raw if keep_raw else None)
+
+    def to_dict(self):
+        ''' Materialize the full player payload.
+
+        Returns
+        -------
+        player_info : dict
+            A dictionary of the full JSON data of the player.
+        '''
+        if self.raw is None:
+            raise ValueError('The raw payload of player {} was not kept.'.format(self.tag))
+        return json_backend.loads(self.raw)
@@ -0,0 +1,265 @@
+import os
+import json
+import zlib
+import datetime
+import threading
+import sqlite3 as sql
+
+import json_backend
+
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+KEYFRAME = 'keyframe'
+DELTA = 'delta'
+
+
+def _encode(data):
+    # the keys are sorted, so equal payloads are encoded into equal bytes
+    return zlib.compress(json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+
+
+def _decode(payload):
+    return json_backend.loads(zlib.decompress(payload))
+
+
+def _format_timestamp(timestamp):
+    return timestamp.isoformat(sep=' ')
+
+
+def diff_payload(old, new, path=None, operations=None):
+    ''' Field level changes between two player payloads.
+
+    Dictionaries are compared key by key and lists of the same length item by item, so a hero
+    upgrade only records the changed level, not the whole list of heroes.
+
+    Parameters
+    ----------
+    old : dict
+        The previous payload.
+    new : dict
+        The new payload.
+
+    Returns
+    -------
+    operations : list of list
+        ``[path, value]`` to set a field and ``[path]`` to delete a field, where ``path`` is a
+        list of dictionary keys and list indices.
+    '''
+    if path is None:
+        path = []
+    if operations is None:
+        operations = []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                operations.append([path + [key], value])
+            else:
+                diff_payload(old[key], value, path + [key], operations)
+        for key in old:
+            if key not in new:
+                operations.append([path + [key]])
+    elif isinstance(old, list) and isinstance(new, list) and (len(old) == len(new)):
+        for index, (old_value, new_value) in enumerate(zip(old, new)):
+            diff_payload(old_value, new_value, path + [index], operations)
+    elif old != new:
+        operations.append([path, new])
+    return operations
+
+
+def apply_delta(data, operations):
+    ''' Apply the changes from ``diff_payload`` to a payload in place.
+
+    Returns
+    -------
+    data : dict
+        The updated payload.
+    '''
+    for operation in operations:
+        path = operation[0]
+        if not path:
+            data = operation[1]
+            continue
+        parent = data
+        for key in path[:-1]:
+            parent = parent[key]
+        if len(operation) == 1:
+            del parent[path[-1]]
+        else:
+            parent[path[-1]] = operation[1]
+    return data
+
+
+class PlayerSnapshotStore:
+    '''
+    Delta-compressed store of the raw player payloads, in a SQLite file next to the database.
+
+    A full keyframe of a player is stored every ``keyframe_interval`` changes, or when the last
+    keyframe is older than ``keyframe_age``. In between, only the fields that changed are stored as
+    compressed deltas, and unchanged payloads are not stored at all, so the store grows with the
+    activity of the players instead of the polling frequency.
+
+    Parameters
+    ----------
+    filename          : str, optional, default to 'player_snapshots.db'
+        The SQLite file of the store, relative to the package directory.
+    keyframe_interval : int, optional, default to 50
+        The maximum number of deltas after a keyframe.
+    keyframe_age      : datetime.timedelta, optional, default to 7 days
+        The maximum age of the keyframe the deltas are applied to.
+    '''
+
+    def __init__(self, filename='player_snapshots.db', keyframe_interval=50,
+                 keyframe_age=datetime.timedelta(days=7)):
+        self.filename = filename
+        self.keyframe_interval = keyframe_interval
+        self.keyframe_age = keyframe_age
+        self._con = None
+        # the payloads are recorded in an executor, one batch at a time
+        self._lock = threading.Lock()
+        # player tag -> (latest encoded payload, keyframe timestamp, number of deltas since the keyframe),
+        # the payloads are only decoded when they changed
+        self._latest = {}
+
+    def _connect(self):
+        if self._con is None:
+            self._con = sql.connect(os.path.join(PATH, self.filename), timeout=30, check_same_thread=False)
+            self._con.execute(
+                'CREATE TABLE IF NOT EXISTS player_snapshots '
+                '(player_tag TEXT, timestamp TEXT, kind TEXT, payload BLOB)')
+            self._con.execute(
+                'CREATE INDEX IF NOT EXISTS ix_player_snapshots_tag_timestamp '
+                'ON player_snapshots (player_tag, timestamp)')
+            self._con.commit()
+        return self._con
+
+    def _load_chain(self, player_tag, timestamp=None):
+        ''' The latest keyframe of a player at a time and the deltas after it.
+        '''
+        con = self._connect()
+        until = '9999' if timestamp is None else _format_timestamp(timestamp)
+        keyframe = con.execute(
+            'SELECT timestamp, payload FROM player_snapshots '
+            'WHERE player_tag = ? AND kind = ? AND timestamp <= ? '
+            'ORDER BY timestamp DESC LIMIT 1', (player_tag, KEYFRAME, until)).fetchone()
+        if keyframe is None:
+            return None, None, []
+        deltas = con.execute(
+            'SELECT payload FROM player_snapshots '
+            'WHERE player_tag = ? AND kind = ? AND timestamp > ? AND timestamp <= ? '
+            'ORDER BY timestamp', (player_tag, DELTA, keyframe[0], until)).fetchall()
+        return keyframe[0], _decode(keyframe[1]), [_decode(payload) for payload, in deltas]
+
+    def _latest_state(self, player_tag):
+        if player_tag not in self._latest:
+            keyframe_timestamp, data, deltas = self._load_chain(player_tag)
+            if data is None:
+                return None
+            for operations in deltas:
+                data = apply_delta(data, operations)
+            self._latest[player_tag] = (
+                _encode(data), datetime.datetime.fromisoformat(keyframe_timestamp), len(deltas))
+        return self._latest[player_tag]
+
+    def record(self, player_info, timestamp=None, commit=True):
+        ''' Store a player payload.
+
+        Parameters
+        ----------
+        player_info : dict or bytes
+            The player payload from the API, decoded or raw JSON.
+        timestamp   : datetime.datetime, optional, default to None
+            The time of the payload, UTC now if None.
+        commit      : bool, optional, default to True
+            Whether to commit right away.
+
+        Returns
+        -------
+        kind : str or None
+            'keyframe' or 'delta', None if nothing changed since the last payload.
+        '''
+        if isinstance(player_info, (bytes, str)):
+            player_info = json_backend.loads(player_info)
+        if timestamp is None:
+            timestamp = datetime.datetime.utcnow()
+        player_tag = player_info['tag']
+        encoded = _encode(player_info)
+        latest = self._latest_state(player_tag)
+        if (latest is not None) and (latest[0] == encoded):
+            return None
+        if (latest is None) or (latest[2] >= self.keyframe_interval) \
+                or (timestamp - latest[1] >= self.keyframe_age):
+            kind, payload = KEYFRAME, encoded
+            self._latest[player_tag] = (encoded, timestamp, 0)
+        else:
+            kind, payload = DELTA, _encode(diff_payload(_decode(latest[0]), player_info))
+            self._latest[player_tag] = (encoded, latest[1], latest[2] + 1)
+        con = self._connect()
+        con.execute('INSERT INTO player_snapshots VALUES (?, ?, ?, ?)',
+                    (player_tag, _format_timestamp(timestamp), kind, payload))
+        if commit:
+            con.commit()
+        return kind
+
+    def record_many(self, players, timestamp=None):
+        ''' Store the payloads of several players in one transaction.
+
+        It can run in an executor, the batches are recorded one at a time.
+
+        Parameters
+        ----------
+        players   : list of dict or bytes
+            The player payloads from the API, decoded or raw JSON.
+        timestamp : datetime.datetime, optional, default to None
+            The time of the payloads, UTC now if None.
+
+        Returns
+        -------
+        stored : int
+            The number of payloads that changed and were stored.
+        '''
+        if timestamp is None:
+            timestamp = datetime.datetime.utcnow()
+        with self._lock:
+            stored = sum(self.record(player_info, timestamp, commit=False) is not None
+                         for player_info in players)
+            self._connect().commit()
+        return stored
+
+    def get(self, player_tag, timestamp=None):
+        ''' Reconstruct the payload of a player at a time.
+
+        Parameters
+        ----------
+        player_tag : str
+            The player tag.
+        timestamp  : datetime.datetime, optional, default to None
+            The time of the payload, the latest payload if None.
+
+        Returns
+        -------
+        player_info : dict or None
+            The payload of the player at the time, None if nothing was stored before it.
+        '''
+        if timestamp is None:
+            latest = self._latest_state(player_tag)
+            return None if latest is None else _decode(latest[0])
+        _, data, deltas = self._load_chain(player_tag, timestamp)
+        if data is None:
+            return None
+        for operations in deltas:
+            data = apply_delta(data, operations)
+        return data
+
+    def timestamps(self, player_tag):
+        ''' Times at which the payload of a player changed.
+        '''
+        rows = self._connect().execute(
+            'SELECT timestamp FROM player_snapshots WHERE player_tag = ? ORDER BY timestamp',
+            (player_tag, )).fetchall()
+        return [datetime.datetime.fromisoformat(timestamp) for timestamp, in rows]
+
+    def close(self):
+        if self._con is not None:
+            self._con.close()
+            self._con = None
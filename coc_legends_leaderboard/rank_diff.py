@@ -0,0 +1,333 @@
+class FenwickTree:
+    '''
+    Fenwick tree of counts, to count and select the values of a multiset in O(log n).
+
+    Parameters
+    ----------
+    size : int
+        The values are integers from 0 to ``size - 1``.
+    '''
+
+    __slots__ = ('size', 'total', '_tree')
+
+    def __init__(self, size):
+        self.size = size
+        self.total = 0
+        self._tree = [0] * (size + 1)
+
+    def add(self, value, count=1):
+        ''' Add ``count`` occurrences of a value, negative to remove them.
+        '''
+        self.total += count
+        index = value + 1
+        while index <= self.size:
+            self._tree[index] += count
+            index += index & -index
+
+    def prefix(self, value):
+        ''' Number of occurrences of the values up to and including ``value``.
+        '''
+        count = 0
+        index = min(value + 1, self.size)
+        while index > 0:
+            count += self._tree[index]
+            index -= index & -index
+        return count
+
+    def select(self, k):
+        ''' The smallest value such that ``k`` occurrences are less than or equal to it.
+        '''
+        index = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            if (index + step <= self.size) and (self._tree[index + step] < k):
+                index += step
+                k -= self._tree[index]
+            step >>= 1
+        return index
+
+
+class RankChanges:
+    '''
+    The rank changes of a leaderboard refresh.
+
+    Parameters
+    ----------
+    moves           : dict(str, tuple(int or None, int or None))
+        The previous and new ranks of the players whose trophies changed, and of the players whose
+        rank they shifted. New players have no previous rank and removed players no new rank.
+    passes          : list of tuple(str, str)
+        The player tags of who passed whom.
+    leader          : str or None
+        The player tag of the #1.
+    previous_leader : str or None
+        The player tag of the previous #1.
+    names           : dict(str, str)
+        The names of the players.
+    '''
+
+    __slots__ = ('moves', 'passes', 'leader', 'previous_leader', 'names')
+
+    def __init__(self, moves=None, passes=None, leader=None, previous_leader=None, names=None):
+        self.moves = moves or {}
+        self.passes = passes or []
+        self.leader = leader
+        self.previous_leader = previous_leader
+        self.names = names or {}
+
+    def __repr__(self):
+        return 'RankChanges({} moves, {} passes, leader={!r})'.format(
+            len(self.moves), len(self.passes), self.leader)
+
+    @property
+    def new_leader(self):
+        ''' Whether the #1 changed.
+        '''
+        return (self.leader is not None) and (self.previous_leader is not None) \
+            and (self.leader != self.previous_leader)
+
+    def movement(self, player_tag):
+        ''' Number of ranks a player moved up, negative if down, None if unknown.
+        '''
+        old_rank, new_rank = self.moves.get(player_tag, (None, None))
+        if (old_rank is None) or (new_rank is None):
+            return None
+        return old_rank - new_rank
+
+    def format_movement(self, player_tag):
+        ''' Format the rank movement of a player, e.g. '▲2', '▼1' or ''.
+        '''
+        movement = self.movement(player_tag)
+        if not movement:
+            return ''
+        return '{}{}'.format('▲' if movement > 0 else '▼', abs(movement))
+
+    def _name(self, player_tag):
+        return self.names.get(player_tag, player_tag)
+
+    def format_announcements(self, max_passes=10):
+        ''' Format the notable changes into lines of text for discord post.
+
+        Parameters
+        ----------
+        max_passes : int, optional, default to 10
+            The maximum number of passes to announce, the highest ranked first.
+
+        Returns
+        -------
+        lines : list of str
+            The announcements, empty if there is nothing notable.
+        '''
+        lines = []
+        if self.new_leader:
+            lines.append('🥇 {} is the new #1, taking over from {}!'.format(
+                self._name(self.leader), self._name(self.previous_leader)))
+        passes = sorted(self.passes, key=lambda tags: self.moves[tags[0]][1])
+        for player_tag, passed_tag in passes[:max_passes]:
+            lines.append('{} passed {} (now #{}).'.format(
+                self._name(player_tag), self._name(passed_tag), self.moves[player_tag][1]))
+        if len(passes) > max_passes:
+            lines.append('... and {} more passes.'.format(len(passes) - max_passes))
+        return lines
+
+
+class RankTracker:
+    '''
+    Keep the ranking of the previous leaderboard and compute the rank changes of a refresh.
+
+    The trophies of all players are kept in a Fenwick tree, so the rank of a player is a
+    count of the players with more trophies in O(log n). Updating ``k`` changed players costs
+    O(k log n) without sorting the leaderboard again. Players with the same trophies share
+    the same rank.
+
+    Parameters
+    ----------
+    max_trophies : int, optional, default to 10000
+        The initial upper bound of the trophies, the tree grows if it is exceeded.
+    '''
+
+    def __init__(self, max_trophies=10000):
+        self.max_trophies = max_trophies
+        self.reset()
+
+    def reset(self, trophies=None, names=None):
+        ''' Start over from a leaderboard.
+
+        Parameters
+        ----------
+        trophies : dict(str, int), optional, default to None
+            The trophies of the players.
+        names    : dict(str, str), optional, default to None
+            The names of the players.
+        '''
+        self._tree = FenwickTree(self.max_trophies + 1)
+        self._trophies = {}
+        # trophies -> player tags
+        self._buckets = {}
+        self.names = dict(names or {})
+        for player_tag, value in (trophies or {}).items():
+            self._insert(player_tag, value)
+        self._leader = self.leader()
+
+    def __len__(self):
+        return len(self._trophies)
+
+    def _grow(self, value):
+        while value > self.max_trophies:
+            self.max_trophies *= 2
+        trophies = self._trophies
+        self._tree = FenwickTree(self.max_trophies + 1)
+        for value in trophies.values():
+            self._tree.add(value)
+
+    def _insert(self, player_tag, value):
+        value = max(int(value), 0)
+        if value > self.max_trophies:
+            self._grow(value)
+        self._trophies[player_tag] = value
+        self._buckets.setdefault(value, set()).add(player_tag)
+        self._tree.add(value)
+
+    def _delete(self, player_tag):
+        value = self._trophies.pop(player_tag)
+        bucket = self._buckets[value]
+        bucket.discard(player_tag)
+        if not bucket:
+            del self._buckets[value]
+        self._tree.add(value, -1)
+
+    def rank(self, player_tag):
+        ''' The current rank of a player, None if not on the leaderboard.
+        '''
+        if player_tag not in self._trophies:
+            return None
+        return self._rank_of(self._trophies[player_tag])
+
+    def _rank_of(self, value):
+        return self._tree.total - self._tree.prefix(value) + 1
+
+    def _values_between(self, low, high):
+        ''' The trophies held by at least one player, from ``low`` to ``high`` excluded.
+
+        Only the occupied values are visited, with ``select`` on the tree, so the cost does not
+        depend on the width of the range.
+        '''
+        if high <= low:
+            return
+        last = self._tree.prefix(high - 1)
+        k = self._tree.prefix(low - 1) + 1 if low > 0 else 1
+        while k <= last:
+            value = self._tree.select(k)
+            yield value
+            k = self._tree.prefix(value) + 1
+
+    def leader(self, previous=None):
+        ''' The player tag of the #1, keeping ``previous`` if they are tied for #1.
+        '''
+        if not self._trophies:
+            return None
+        top = self._tree.select(self._tree.total)
+        bucket = self._buckets[top]
+        if previous in bucket:
+            return previous
+        return min(bucket)
+
+    def update(self, trophies, removed=(), names=None):
+        ''' Apply the changed players and compute the rank changes.
+
+        Parameters
+        ----------
+        trophies : dict(str, int)
+            The new trophies of the players that are new or changed.
+        removed  : list of str, optional, default to ()
+            Tags of the players that left the leaderboard.
+        names    : dict(str, str), optional, default to None
+            The names of the players.
+
+        Returns
+        -------
+        changes : RankChanges
+            The rank changes. Passes are found among the players whose trophies are within the
+            range climbed by a player, and who were ahead of that player before. The players
+            within the range crossed by a changed player, and those below a new or removed
+            player, are moved as well, so a player who is overtaken without playing moves down.
+        '''
+        if names:
+            self.names.update(names)
+        previous_leader = self._leader
+        old_trophies = {player_tag: self._trophies.get(player_tag)
+                        for player_tag in list(trophies) + list(removed)}
+        old_ranks = {player_tag: self.rank(player_tag) for player_tag in old_trophies}
+        # the unchanged players whose rank is shifted: those crossed by a changed player, and
+        # those below a new or removed player
+        ranges = []
+        below = 0
+        for player_tag, value in trophies.items():
+            old_value = old_trophies[player_tag]
+            value = max(int(value), 0)
+            if old_value is None:
+                below = max(below, value)
+            else:
+                ranges.append((min(old_value, value), max(old_value, value)))
+        for player_tag in removed:
+            if old_trophies[player_tag] is not None:
+                below = max(below, old_trophies[player_tag])
+        # the values below ``below`` are only visited once
+        spans = [(0, below)] + [(max(low, below), high) for low, high in ranges]
+        for low, high in spans:
+            for crossed in self._values_between(low, high):
+                for crossed_tag in self._buckets[crossed]:
+                    if crossed_tag not in old_ranks:
+                        old_ranks[crossed_tag] = self._rank_of(crossed)
+
+        for player_tag in old_trophies:
+            if player_tag in self._trophies:
+                self._delete(player_tag)
+        for player_tag, value in trophies.items():
+            self._insert(player_tag, value)
+
+        moves = {player_tag: (old_rank, self.rank(player_tag)) for player_tag, old_rank in old_ranks.items()}
+        passes = []
+        for player_tag, value in trophies.items():
+            old_value = old_trophies[player_tag]
+            if (old_value is None) or (self._trophies[player_tag] <= old_value):
+                continue
+            for climbed in self._values_between(old_value + 1, self._trophies[player_tag]):
+                for passed_tag in self._buckets[climbed]:
+                    previous_value = old_trophies.get(passed_tag, climbed)
+                    if (previous_value is not None) and (previous_value > old_value):
+                        passes.append((player_tag, passed_tag))
+        self._leader = self.leader(previous_leader)
+        return RankChanges(
+            moves=moves,
+            passes=passes,
+            leader=self._leader,
+            previous_leader=previous_leader,
+            names=self.names,
+        )
+
+    def diff(self, data):
+        ''' Compute the rank changes from a full leaderboard.
+
+        Only the trophies of the players are compared with the previous leaderboard, the rank
+        changes are computed for the changed players and the players whose rank they shifted only.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            A Pandas DataFrame of the leaderboard, with the columns ``player_tag``, ``name`` and
+            ``trophies``.
+
+        Returns
+        -------
+        changes : RankChanges
+            See ``update``.
+        '''
+        tags = data['player_tag'].to_list()
+        values = data['trophies'].to_list()
+        changed = {player_tag: int(value) for player_tag, value in zip(tags, values)
+                   if self._trophies.get(player_tag) != int(value)}
+        removed = set(self._trophies).difference(tags)
+        names = {player_tag: data['name'].iloc[index]
+                 for index, player_tag in enumerate(tags) if player_tag in changed}
+        return self.update(changed, removed=removed, names=names)
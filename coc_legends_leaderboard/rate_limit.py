@@ -0,0 +1,100 @@
+import os
+import time
+import asyncio
+import threading
+import sqlite3 as sql
+
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+class SharedRateLimiter:
+    '''
+    Token bucket rate limiter shared by several processes through a local SQLite file.
+
+    Every process opens its own limiter on the same file. The bucket state is read and updated
+    inside an immediate transaction, so the processes together never spend more than ``rate``
+    requests per second on average, with bursts of at most ``burst`` requests. The transactions
+    run in an executor, so waiting for the lock of another process never blocks the event loop.
+
+    Parameters
+    ----------
+    filename : str
+        The SQLite file of the bucket, relative to the package directory.
+    rate     : float
+        The number of requests allowed per second.
+    burst    : int, optional, default to None
+        The size of the bucket. If None, one second worth of requests.
+    name     : str, optional, default to 'default'
+        The name of the bucket, so a file can hold several buckets.
+    '''
+
+    def __init__(self, filename, rate, burst=None, name='default'):
+        self.filename = filename
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.name = name
+        self._con = None
+        # the connection is shared by the executor threads, one transaction at a time
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._con is None:
+            self._con = sql.connect(os.path.join(PATH, self.filename), timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+            self._con.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit (name TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+        return self._con
+
+    def reset(self):
+        ''' Refill the bucket, e.g. before starting the workers.
+        '''
+        with self._lock:
+            con = self._connect()
+            con.execute('INSERT OR REPLACE INTO rate_limit VALUES (?, ?, ?)', (self.name, self.burst, time.time()))
+
+    def try_acquire(self):
+        ''' Try to take a token from the bucket.
+
+        Returns
+        -------
+        wait : float
+            0 if a token was taken, otherwise the number of seconds until a token is available.
+        '''
+        with self._lock:
+            return self._try_acquire()
+
+    def _try_acquire(self):
+        con = self._connect()
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = con.execute('SELECT tokens, updated FROM rate_limit WHERE name = ?', (self.name, )).fetchone()
+            tokens, updated = row if row is not None else (self.burst, now)
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.
+            else:
+                wait = (1 - tokens) / self.rate
+            con.execute('INSERT OR REPLACE INTO rate_limit VALUES (?, ?, ?)', (self.name, tokens, now))
+            con.execute('COMMIT')
+        except Exception:
+            con.execute('ROLLBACK')
+            raise
+        return wait
+
+    async def acquire(self):
+        ''' Wait until a token is taken from the bucket.
+        '''
+        loop = asyncio.get_event_loop()
+        while True:
+            wait = await loop.run_in_executor(None, self.try_acquire)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    def close(self):
+        if self._con is not None:
+            self._con.close()
+            self._con = None
@@ -0,0 +1,329 @@
+import os
+import logging
+import datetime
+import numpy as np
+import pandas as pd
+import sqlite3 as sql
+
+from legends_leaderboard import HISTORY_TABLE, LegendsLeagueLeaderboard, empty_leaderboard
+from season_archive import ARCHIVE_DIR, archive_history
+
+
+logging.basicConfig(level=logging.INFO)
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+# legend days reset at 05:00 UTC
+LEGEND_DAY_OFFSET = pd.Timedelta(hours=5)
+
+HOURLY_TABLE = HISTORY_TABLE + '_hourly'
+DAILY_TABLE = HISTORY_TABLE + '_daily'
+BAR_COLUMNS = ['season', 'player_tag', 'name', 'bucket', 'open', 'close', 'low', 'high',
+               'attack_wins', 'defense_wins', 'gains', 'losses', 'samples']
+RESOLUTIONS = {
+    'raw': None,
+    'hour': pd.Timedelta(hours=1),
+    'day': pd.Timedelta(days=1),
+}
+
+
+def _create_tables(con):
+    for table in (HOURLY_TABLE, DAILY_TABLE):
+        con.execute(
+            'CREATE TABLE IF NOT EXISTS {} (season TEXT, player_tag TEXT, name TEXT, bucket TEXT, '
+            'open INTEGER, close INTEGER, low INTEGER, high INTEGER, attack_wins INTEGER, '
+            'defense_wins INTEGER, gains INTEGER, losses INTEGER, samples INTEGER, '
+            'PRIMARY KEY (player_tag, bucket))'.format(table))
+        con.execute('CREATE INDEX IF NOT EXISTS ix_{table}_season_bucket ON {table} (season, bucket)'.format(
+            table=table))
+
+
+def legend_day_start(timestamp):
+    ''' Start of the legend day of a time, legend days reset at 05:00 UTC.
+    '''
+    return (pd.Timestamp(timestamp) - LEGEND_DAY_OFFSET).floor('D') + LEGEND_DAY_OFFSET
+
+
+def _bucket(timestamps, freq):
+    if freq >= pd.Timedelta(days=1):
+        return (timestamps - LEGEND_DAY_OFFSET).dt.floor(freq) + LEGEND_DAY_OFFSET
+    return timestamps.dt.floor(freq)
+
+
+def snapshots_to_bars(history, previous=None):
+    ''' Turn raw leaderboard snapshots into bars of a single sample.
+
+    Parameters
+    ----------
+    history  : pandas.DataFrame
+        A Pandas DataFrame of leaderboard snapshots from the history table.
+    previous : dict(tuple(str, str), int), optional, default to None
+        The closing trophies of the last bar before the snapshots, by season and player tag,
+        so the change to the first snapshot of a player is counted too.
+
+    Returns
+    -------
+    bars : pandas.DataFrame
+        A Pandas DataFrame with the columns ``BAR_COLUMNS``. ``gains`` and ``losses`` count the
+        trophy changes since the previous snapshot of the player.
+    '''
+    history = history.reindex(columns=['season', 'player_tag', 'name', 'trophies', 'attack_wins',
+                                       'defense_wins', 'timestamp'])
+    history = history.assign(timestamp=pd.to_datetime(history['timestamp'])) \
+        .sort_values(by=['player_tag', 'timestamp'], kind='stable')
+    delta = history.groupby('player_tag', sort=False)['trophies'].diff()
+    if previous:
+        first = history.loc[delta.isna()]
+        closes = pd.Series([previous.get(key, np.nan) for key in zip(first['season'], first['player_tag'])],
+                           index=first.index, dtype=float)
+        delta = delta.fillna(first['trophies'] - closes)
+    return pd.DataFrame({
+        'season': history['season'],
+        'player_tag': history['player_tag'],
+        'name': history['name'],
+        'bucket': history['timestamp'],
+        'open': history['trophies'],
+        'close': history['trophies'],
+        'low': history['trophies'],
+        'high': history['trophies'],
+        'attack_wins': history['attack_wins'],
+        'defense_wins': history['defense_wins'],
+        'gains': (delta > 0).astype(int),
+        'losses': (delta < 0).astype(int),
+        'samples': 1,
+    }).reset_index(drop=True)
+
+
+def rollup_bars(bars, freq):
+    ''' Aggregate bars into coarser bars.
+
+    Daily bars are aligned to the legend days.
+
+    Parameters
+    ----------
+    bars : pandas.DataFrame
+        A Pandas DataFrame with the columns ``BAR_COLUMNS``.
+    freq : pandas.Timedelta
+        The width of the aggregated bars.
+
+    Returns
+    -------
+    bars : pandas.DataFrame
+        The aggregated bars, with the opening and closing trophies, the lowest and highest
+        trophies, the attack and defense wins at the close, and the summed counts.
+    '''
+    bars = bars.sort_values(by=['player_tag', 'bucket'], kind='stable')
+    bars = bars.assign(bucket=_bucket(pd.to_datetime(bars['bucket']), freq))
+    return bars.groupby(['season', 'player_tag', 'bucket'], sort=False).agg(
+        name=('name', 'last'),
+        open=('open', 'first'),
+        close=('close', 'last'),
+        low=('low', 'min'),
+        high=('high', 'max'),
+        attack_wins=('attack_wins', 'last'),
+        defense_wins=('defense_wins', 'last'),
+        gains=('gains', 'sum'),
+        losses=('losses', 'sum'),
+        samples=('samples', 'sum'),
+    ).reset_index()[BAR_COLUMNS]
+
+
+def _last_closes(con):
+    ''' The closing trophies of the last hourly or daily bar of every season and player.
+    '''
+    closes = {}
+    # the hourly bars are more recent than the daily bars
+    for table in (DAILY_TABLE, HOURLY_TABLE):
+        rows = con.execute(
+            'SELECT season, player_tag, close FROM {table} AS bar WHERE bucket = '
+            '(SELECT MAX(bucket) FROM {table} WHERE season = bar.season AND player_tag = bar.player_tag)'.format(
+                table=table))
+        closes.update(((season, player_tag), close) for season, player_tag, close in rows)
+    return closes
+
+
+def _insert_bars(con, table, bars):
+    bars = bars.assign(bucket=bars['bucket'].astype(str))
+    rows = bars.astype(object).where(bars.notna(), None).itertuples(index=False, name=None)
+    con.executemany('INSERT OR REPLACE INTO {} VALUES ({})'.format(
+        table, ', '.join('?' * len(BAR_COLUMNS))), rows)
+
+
+def compact_history(dbname, now=None, raw_retention=None, hourly_retention=datetime.timedelta(days=7),
+                    archive_dir=ARCHIVE_DIR, archive=True):
+    ''' Roll the trophy history up into hourly and daily bars and prune the rolled up rows.
+
+    Raw snapshots older than the raw retention are rolled up into hourly bars, and hourly bars
+    older than the hourly retention into daily bars aligned to the legend days. The rows are
+    written and pruned in one transaction, and only complete hours and legend days are rolled
+    up, so the job can be run at any time.
+
+    Parameters
+    ----------
+    dbname           : str
+        The database file name.
+    now              : datetime.datetime, optional, default to None
+        The current UTC time, UTC now if None.
+    raw_retention    : datetime.timedelta, optional, default to None
+        How long the raw snapshots are kept. If None, the snapshots of the current legend day
+        are kept.
+    hourly_retention : datetime.timedelta, optional, default to 7 days
+        How long the hourly bars are kept, rounded down to the start of a legend day.
+    archive_dir      : str, optional
+        The root directory of the season archives.
+    archive          : bool, optional, default to True
+        Whether to copy the raw snapshots into the season archives before pruning them.
+
+    Returns
+    -------
+    compacted : dict(str, int)
+        The number of raw snapshots and hourly bars that have been rolled up.
+    '''
+    now = pd.Timestamp(now or datetime.datetime.utcnow())
+    if raw_retention is None:
+        raw_cutoff = legend_day_start(now)
+    else:
+        raw_cutoff = (now - pd.Timedelta(raw_retention)).floor('h')
+    hourly_cutoff = legend_day_start(now - pd.Timedelta(hourly_retention))
+    compacted = {'raw': 0, 'hourly': 0}
+
+    with sql.connect(os.path.join(PATH, dbname)) as con:
+        _create_tables(con)
+        try:
+            raw = pd.read_sql('SELECT * FROM {} WHERE timestamp < ?'.format(HISTORY_TABLE),
+                              con=con, params=(str(raw_cutoff),))
+        except pd.io.sql.DatabaseError:
+            raw = pd.DataFrame()
+        if len(raw) > 0:
+            raw['timestamp'] = pd.to_datetime(raw['timestamp'])
+            if archive:
+                archive_history(raw, archive_dir)
+            hourly = rollup_bars(snapshots_to_bars(raw, _last_closes(con)), RESOLUTIONS['hour'])
+            with con:
+                _insert_bars(con, HOURLY_TABLE, hourly)
+                con.execute('DELETE FROM {} WHERE timestamp < ?'.format(HISTORY_TABLE), (str(raw_cutoff),))
+            compacted['raw'] = len(raw)
+            logging.info('Rolled up {} snapshots into {} hourly bars.'.format(len(raw), len(hourly)))
+
+        hourly = pd.read_sql('SELECT * FROM {} WHERE bucket < ?'.format(HOURLY_TABLE),
+                             con=con, params=(str(hourly_cutoff),))
+        if len(hourly) > 0:
+            daily = rollup_bars(hourly, RESOLUTIONS['day'])
+            with con:
+                _insert_bars(con, DAILY_TABLE, daily)
+                con.execute('DELETE FROM {} WHERE bucket < ?'.format(HOURLY_TABLE), (str(hourly_cutoff),))
+            compacted['hourly'] = len(hourly)
+            logging.info('Rolled up {} hourly bars into {} daily bars.'.format(len(hourly), len(daily)))
+    return compacted
+
+
+def _read_tier(con, table, time_column, season, player_tags, start, end):
+    query = 'SELECT * FROM {} WHERE season = ?'.format(table)
+    params = [season]
+    if start is not None:
+        query += ' AND {} >= ?'.format(time_column)
+        params.append(str(pd.Timestamp(start)))
+    if end is not None:
+        query += ' AND {} < ?'.format(time_column)
+        params.append(str(pd.Timestamp(end)))
+    if player_tags is not None:
+        query += ' AND player_tag IN ({})'.format(', '.join('?' * len(player_tags)))
+        params.extend(player_tags)
+    try:
+        return pd.read_sql(query, con=con, params=params)
+    except pd.io.sql.DatabaseError:
+        return pd.DataFrame()
+
+
+def load_series(dbname, season, resolution='day', player_tags=None, start=None, end=None):
+    ''' Load the trophy history of a season as bars, from the coarsest tier that covers each period.
+
+    The daily bars are read first, the hourly bars only after the last daily bar and the raw
+    snapshots only after the last hourly bar, so no period is ever counted twice at different
+    resolutions. The finer tiers are then rolled up to the requested resolution, so a
+    season-long series at daily resolution reads about one row per player and day.
+
+    Parameters
+    ----------
+    dbname      : str
+        The database file name.
+    season      : str
+        The season, e.g. '2021-03'.
+    resolution  : str, optional, default to 'day'
+        One of 'raw', 'hour' or 'day'. Old history is only available in daily bars.
+    player_tags : list of str, optional, default to None
+        If given, only load these players.
+    start       : datetime.datetime, optional, default to None
+        If given, only load the history from this time.
+    end         : datetime.datetime, optional, default to None
+        If given, only load the history before this time.
+
+    Returns
+    -------
+    bars : pandas.DataFrame
+        A Pandas DataFrame with the columns ``BAR_COLUMNS``, sorted by player and time.
+    '''
+    freq = RESOLUTIONS[resolution]
+    tiers = []
+    covered = None if start is None else pd.Timestamp(start)
+    with sql.connect(os.path.join(PATH, dbname)) as con:
+        for table, width in ((DAILY_TABLE, RESOLUTIONS['day']), (HOURLY_TABLE, RESOLUTIONS['hour'])):
+            bars = _read_tier(con, table, 'bucket', season, player_tags, covered, end)
+            if len(bars) > 0:
+                bars['bucket'] = pd.to_datetime(bars['bucket'])
+                covered = bars['bucket'].max() + width
+                tiers.append(bars)
+        raw = _read_tier(con, HISTORY_TABLE, 'timestamp', season, player_tags, covered, end)
+    if len(raw) > 0:
+        previous = None
+        if tiers:
+            last = pd.concat(tiers, ignore_index=True).sort_values(by='bucket', kind='stable') \
+                .groupby(['season', 'player_tag'])['close'].last()
+            previous = last.to_dict()
+        tiers.append(snapshots_to_bars(raw, previous))
+    tiers = [bars.reindex(columns=BAR_COLUMNS) for bars in tiers]
+    if not tiers:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+    bars = pd.concat(tiers, ignore_index=True)
+    if freq is not None:
+        # coarser bars are left as they are, finer bars and snapshots are aggregated
+        bars = rollup_bars(bars, freq)
+    return bars.sort_values(by=['player_tag', 'bucket'], kind='stable').reset_index(drop=True)
+
+
+def load_latest_board(dbname, season, player_tags=None):
+    ''' Rebuild the leaderboard of a season from the last bar of every player in the history.
+
+    Parameters
+    ----------
+    dbname      : str
+        The database file name.
+    season      : str
+        The season, e.g. '2021-03'.
+    player_tags : list of str, optional, default to None
+        If given, only the players of the roster, so removed players do not come back.
+
+    Returns
+    -------
+    dataframe : pandas.DataFrame
+        A Pandas DataFrame of the leaderboard, sorted. Empty if the season has no history.
+    '''
+    bars = load_series(dbname, season, resolution='raw')
+    if player_tags is not None:
+        bars = bars.loc[bars['player_tag'].isin(player_tags)]
+    if len(bars) == 0:
+        return empty_leaderboard()
+    last = bars.groupby('player_tag', sort=False).last().reset_index()
+    dataframe = pd.DataFrame({
+        'player_tag': last['player_tag'],
+        'name': last['name'],
+        'trophies': last['close'].astype(int),
+        'attack_wins': last['attack_wins'],
+        'defense_wins': last['defense_wins'],
+        'timestamp': pd.to_datetime(last['bucket']),
+    })
+    return dataframe.sort_values(by='trophies', ascending=False).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    lll = LegendsLeagueLeaderboard(filename=None, api_token=None)
+    compact_history(lll.dbname)
@@ -0,0 +1,205 @@
+import heapq
+import logging
+import datetime
+
+
+logging.basicConfig(level=logging.INFO)
+
+# legend days reset at 05:00 UTC
+LEGEND_DAY_RESET_HOUR = 5
+
+
+def get_next_legend_day_reset(date):
+    ''' Find the next legend day reset (05:00 UTC) after the date.
+
+    Parameters
+    ----------
+    date : datetime.datetime
+        The UTC date.
+
+    Returns
+    -------
+    retval : datetime.datetime
+        The datetime.datetime object of the next reset.
+    '''
+    reset = date.replace(hour=LEGEND_DAY_RESET_HOUR, minute=0, second=0, microsecond=0)
+    if reset <= date:
+        reset += datetime.timedelta(days=1)
+    return reset
+
+
+class AdaptivePollScheduler:
+    '''
+    Priority queue of the next poll time of each player.
+
+    The polling interval of a player is adapted from how often the trophies of the player changed
+    recently, the rank of the player, and the time until the legend day reset:
+
+    * Players whose trophies change often are polled close to ``min_interval``, players whose
+      trophies do not change are backed off towards ``max_interval``.
+    * Players at the top of the board are polled more often than the rest.
+    * Shortly before the legend day reset every legend player is polled at ``min_interval``, so the
+      end-of-day trophies are captured.
+    * Players that are not in Legend League are polled at ``max_interval``.
+
+    At most ``budget_per_minute`` players are handed out by ``due`` for each minute, the most
+    overdue ones first.
+
+    Parameters
+    ----------
+    budget_per_minute : int, optional, default to 60
+        The number of player requests to spend per minute.
+    min_interval      : datetime.timedelta, optional, default to 2 minutes
+        The shortest polling interval.
+    max_interval      : datetime.timedelta, optional, default to 1 hour
+        The longest polling interval.
+    top_ranks         : int, optional, default to 10
+        Players ranked within ``top_ranks`` get the shortest intervals.
+    activity_decay    : float, optional, default to 0.7
+        Weight of the previous activity when a new poll result comes in.
+    reset_window      : datetime.timedelta, optional, default to 30 minutes
+        The window before the legend day reset where legend players are polled at ``min_interval``.
+    '''
+
+    def __init__(
+        self,
+        budget_per_minute=60,
+        min_interval=datetime.timedelta(minutes=2),
+        max_interval=datetime.timedelta(hours=1),
+        top_ranks=10,
+        activity_decay=0.7,
+        reset_window=datetime.timedelta(minutes=30),
+    ):
+        self.budget_per_minute = budget_per_minute
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.top_ranks = top_ranks
+        self.activity_decay = activity_decay
+        self.reset_window = reset_window
+        self._queue = []
+        self._next_poll = {}
+        self._activity = {}
+        self._trophies = {}
+        self._last_due = None
+        self._budget = 0
+
+    def __len__(self):
+        return len(self._next_poll)
+
+    def _schedule(self, player_tag, next_poll):
+        self._next_poll[player_tag] = next_poll
+        heapq.heappush(self._queue, (next_poll, player_tag))
+
+    def sync(self, player_tags, now=None):
+        ''' Synchronize the scheduled players with the registered players.
+
+        New players are scheduled to be polled immediately, removed players are dropped.
+
+        Parameters
+        ----------
+        player_tags : list of str
+            Tags of registered players.
+        now         : datetime.datetime, optional, default to None
+            The current UTC time.
+        '''
+        now = now or datetime.datetime.utcnow()
+        player_tags = set(player_tags)
+        for player_tag in list(self._next_poll):
+            if player_tag not in player_tags:
+                # entries left in the queue are skipped lazily
+                del self._next_poll[player_tag]
+                self._activity.pop(player_tag, None)
+                self._trophies.pop(player_tag, None)
+        for player_tag in player_tags:
+            if player_tag not in self._next_poll:
+                self._schedule(player_tag, now)
+
+    def due(self, now=None):
+        ''' Pop the players that are due for polling, within the budget.
+
+        The budget accumulates for every minute since the last call, up to one minute worth of
+        requests, so calling this more often than once per minute does not overspend.
+
+        Parameters
+        ----------
+        now : datetime.datetime, optional, default to None
+            The current UTC time.
+
+        Returns
+        -------
+        player_tags : list of str
+            Tags of players to poll, the most overdue first.
+        '''
+        now = now or datetime.datetime.utcnow()
+        if self._last_due is None:
+            self._budget = self.budget_per_minute
+        else:
+            elapsed = (now - self._last_due).total_seconds() / 60
+            self._budget = min(self.budget_per_minute, self._budget + elapsed * self.budget_per_minute)
+        self._last_due = now
+
+        player_tags = []
+        while self._queue and self._budget >= 1 and self._queue[0][0] <= now:
+            next_poll, player_tag = heapq.heappop(self._queue)
+            if self._next_poll.get(player_tag) != next_poll:
+                # stale entry of a rescheduled or removed player
+                continue
+            del self._next_poll[player_tag]
+            player_tags.append(player_tag)
+            self._budget -= 1
+        return player_tags
+
+    def _interval(self, player_tag, rank, in_legend, now):
+        if not in_legend:
+            return self.max_interval
+        if get_next_legend_day_reset(now) - now <= self.reset_window:
+            return self.min_interval
+        activity = self._activity.get(player_tag, 1.)
+        if rank is None:
+            rank_weight = 1.
+        else:
+            rank_weight = min(1., max(rank, 1) / self.top_ranks) ** 0.5
+        span = self.max_interval - self.min_interval
+        return self.min_interval + span * ((1. - activity) * rank_weight)
+
+    def update(self, player_tag, trophies, rank=None, in_legend=True, now=None):
+        ''' Record a poll result and reschedule the player.
+
+        Parameters
+        ----------
+        player_tag : str
+            The player tag.
+        trophies   : int
+            The current trophies of the player.
+        rank       : int, optional, default to None
+            The rank of the player on the leaderboard, starting from 1.
+        in_legend  : bool, optional, default to True
+            Whether the player is in Legend League.
+        now        : datetime.datetime, optional, default to None
+            The current UTC time.
+        '''
+        now = now or datetime.datetime.utcnow()
+        previous = self._trophies.get(player_tag)
+        changed = 1. if (previous is None or previous != trophies) else 0.
+        self._activity[player_tag] = self.activity_decay * self._activity.get(player_tag, changed) \
+            + (1. - self.activity_decay) * changed
+        self._trophies[player_tag] = trophies
+
+        next_poll = now + self._interval(player_tag, rank, in_legend, now)
+        if in_legend:
+            # make sure the first trophies of the new legend day are picked up
+            next_poll = min(next_poll, get_next_legend_day_reset(now) + self.min_interval)
+        self._schedule(player_tag, next_poll)
+
+    def defer(self, player_tag, now=None):
+        ''' Reschedule a player whose poll failed after ``min_interval``.
+
+        Parameters
+        ----------
+        player_tag : str
+            The player tag.
+        now        : datetime.datetime, optional, default to None
+            The current UTC time.
+        '''
+        now = now or datetime.datetime.utcnow()
+        self._schedule(player_tag, now + self.min_interval)
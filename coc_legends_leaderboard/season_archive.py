@@ -0,0 +1,186 @@
+import os
+import glob
+import logging
+import pandas as pd
+import sqlite3 as sql
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from legends_leaderboard import HISTORY_TABLE, LegendsLeagueLeaderboard
+
+
+logging.basicConfig(level=logging.INFO)
+PATH = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.path.join(PATH, 'archive')
+ARCHIVE_FILENAME = 'history.arrow'
+
+
+def season_archive_path(season, archive_dir=ARCHIVE_DIR):
+    ''' Path of the archive file of a season.
+
+    Parameters
+    ----------
+    season      : str
+        The season, e.g. '2021-03'.
+    archive_dir : str, optional
+        The root directory of the season archives.
+
+    Returns
+    -------
+    path : str
+        The path to the Arrow IPC file of the season.
+    '''
+    return os.path.join(archive_dir, 'season={}'.format(season), ARCHIVE_FILENAME)
+
+
+def list_archived_seasons(archive_dir=ARCHIVE_DIR):
+    ''' List the seasons that have been archived.
+
+    Returns
+    -------
+    seasons : list of str
+        Sorted list of archived seasons.
+    '''
+    pattern = os.path.join(archive_dir, 'season=*', ARCHIVE_FILENAME)
+    seasons = [os.path.basename(os.path.dirname(path)).split('=', 1)[1]
+               for path in glob.glob(pattern)]
+    return sorted(seasons)
+
+
+def load_season(season, archive_dir=ARCHIVE_DIR):
+    ''' Load the trophy history of an archived season.
+
+    The file is memory-mapped, so the columns of the returned table reference the pages of
+    the file directly instead of being copied into memory.
+
+    Parameters
+    ----------
+    season      : str
+        The season, e.g. '2021-03'.
+    archive_dir : str, optional
+        The root directory of the season archives.
+
+    Returns
+    -------
+    table : pyarrow.Table
+        The trophy history of the season.
+    '''
+    source = pa.memory_map(season_archive_path(season, archive_dir), 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def load_player_history(player_tag, seasons=None, archive_dir=ARCHIVE_DIR):
+    ''' Load the multi-season trophy history of a player.
+
+    Parameters
+    ----------
+    player_tag  : str, starts with '#'
+        The player tag '#...'.
+    seasons     : list of str, optional, default to None
+        The seasons to load. If None, all archived seasons are loaded.
+    archive_dir : str, optional
+        The root directory of the season archives.
+
+    Returns
+    -------
+    table : pyarrow.Table
+        The trophy history of the player, ordered by season and timestamp.
+    '''
+    if seasons is None:
+        seasons = list_archived_seasons(archive_dir)
+    tables = []
+    for season in seasons:
+        table = load_season(season, archive_dir)
+        tables.append(table.filter(pc.equal(table['player_tag'], player_tag)))
+    if not tables:
+        return pa.table({})
+    table = pa.concat_tables(tables, promote_options='default')
+    return table.sort_by([('season', 'ascending'), ('timestamp', 'ascending')])
+
+
+def _write_season(data, season, archive_dir):
+    ''' Write (or merge into) the archive file of a season.
+    '''
+    path = season_archive_path(season, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        data = pd.concat([load_season(season, archive_dir).to_pandas(), data], ignore_index=True)
+    data = data.drop_duplicates(subset=['player_tag', 'timestamp']) \
+        .sort_values(by=['timestamp', 'player_tag']) \
+        .reset_index(drop=True)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    # write to a temporary file first so readers never see a partial archive
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def archive_history(data, archive_dir=ARCHIVE_DIR):
+    ''' Merge trophy history rows into the archives of their seasons.
+
+    Parameters
+    ----------
+    data        : pandas.DataFrame
+        A Pandas DataFrame of history rows, with a ``season`` column.
+    archive_dir : str, optional
+        The root directory of the season archives.
+
+    Returns
+    -------
+    archived : dict(str, int)
+        The number of rows in the archive of each season that has been written.
+    '''
+    return {season: _write_season(rows, season, archive_dir)
+            for season, rows in data.groupby('season', sort=True)}
+
+
+def compact_closed_seasons(dbname, current_season, archive_dir=ARCHIVE_DIR, prune=True):
+    ''' Move the trophy history of closed seasons from the database into season archives.
+
+    Each closed season is written into its own uncompressed Arrow IPC file
+    ``<archive_dir>/season=<season>/history.arrow``, which can be memory-mapped for reading.
+
+    Parameters
+    ----------
+    dbname         : str
+        The database file name.
+    current_season : str
+        The current season, which is still open and thus not archived.
+    archive_dir    : str, optional
+        The root directory of the season archives.
+    prune          : bool, optional, default to True
+        Whether to delete the archived rows from the database.
+
+    Returns
+    -------
+    archived : dict(str, int)
+        The number of rows in the archive of each season that has been compacted.
+    '''
+    archived = {}
+    with sql.connect(os.path.join(PATH, dbname)) as con:
+        try:
+            seasons = pd.read_sql(
+                'SELECT DISTINCT season FROM {} WHERE season != ?'.format(HISTORY_TABLE),
+                con=con, params=(current_season,))['season'].to_list()
+        except pd.io.sql.DatabaseError:
+            logging.warning('No leaderboard history to compact.')
+            return archived
+        for season in sorted(seasons):
+            data = pd.read_sql(
+                'SELECT * FROM {} WHERE season = ?'.format(HISTORY_TABLE),
+                con=con, params=(season,))
+            data['timestamp'] = pd.to_datetime(data['timestamp'])
+            archived[season] = _write_season(data, season, archive_dir)
+            logging.info('Archived season {} ({} rows).'.format(season, archived[season]))
+            if prune:
+                con.execute('DELETE FROM {} WHERE season = ?'.format(HISTORY_TABLE), (season,))
+                con.commit()
+    return archived
+
+
+if __name__ == '__main__':
+    lll = LegendsLeagueLeaderboard(filename=None, api_token=None)
+    compact_closed_seasons(lll.dbname, lll.current_season)
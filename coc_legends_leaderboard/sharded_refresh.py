@@ -0,0 +1,103 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from coc import ClashOfClans
+from rate_limit import SharedRateLimiter
+
+
+logging.basicConfig(level=logging.INFO)
+PATH = os.path.dirname(os.path.abspath(__file__))
+RATE_LIMIT_DBNAME = 'rate_limit.db'
+
+
+async def _refresh_shard_async(api_token, player_tags, rate, max_connections):
+    limiter = SharedRateLimiter(RATE_LIMIT_DBNAME, rate=rate)
+    try:
+        async with ClashOfClans(api_token, rate_limiter=limiter, max_connections=max_connections) as coc:
+            players = await asyncio.gather(
+                *[coc.get_player(player_tag, keep_raw=False) for player_tag in player_tags],
+                return_exceptions=True)
+    finally:
+        limiter.close()
+
+    rows = []
+    for player_tag, player in zip(player_tags, players):
+        if isinstance(player, Exception):
+            logging.warning('Failed to refresh player {}: {}'.format(player_tag, player))
+        elif not player.league_id == ClashOfClans.legend_league_id:
+            logging.warning('Player {player_tag} not in Legend League, skip.'.format(player_tag=player_tag))
+        else:
+            # only send back the fields of the leaderboard
+            rows.append((
+                player.tag,
+                player.name,
+                player.trophies,
+                player.attack_wins,
+                player.defense_wins,
+            ))
+    return rows
+
+
+def refresh_shard(api_token, player_tags, rate, max_connections=20):
+    ''' Refresh a shard of players in a worker process.
+
+    Parameters
+    ----------
+    api_token       : str
+        The API token for authentication.
+    player_tags     : list of str
+        Tags of the players of the shard.
+    rate            : float
+        The number of requests per second allowed for all the workers together.
+    max_connections : int, optional, default to 20
+        The maximum number of connections of the worker.
+
+    Returns
+    -------
+    rows : list of tuple
+        The tag, name, trophies, attack wins and defense wins of the legend players in the shard.
+    '''
+    return asyncio.run(_refresh_shard_async(api_token, player_tags, rate, max_connections))
+
+
+def sharded_refresh(api_token, player_tags, workers=4, shard_size=500, rate=30, max_connections=20):
+    '''
+    Refresh the players with a pool of worker processes.
+
+    The players are split into shards of ``shard_size`` players. Each shard is refreshed by a
+    worker process with its own pooled client, and all workers share the same rate limit through
+    ``rate_limit.db``. The results of each shard are collected as soon as the shard finishes.
+
+    Parameters
+    ----------
+    api_token       : str
+        The API token for authentication.
+    player_tags     : list of str
+        Tags of players to refresh.
+    workers         : int, optional, default to 4
+        The number of worker processes.
+    shard_size      : int, optional, default to 500
+        The number of players of each shard.
+    rate            : float, optional, default to 30
+        The number of requests per second allowed for all the workers together.
+    max_connections : int, optional, default to 20
+        The maximum number of connections of each worker.
+
+    Returns
+    -------
+    rows : list of tuple
+        The tag, name, trophies, attack wins and defense wins of the legend players.
+    '''
+    limiter = SharedRateLimiter(RATE_LIMIT_DBNAME, rate=rate)
+    limiter.reset()
+    limiter.close()
+    shards = [player_tags[index: index + shard_size] for index in range(0, len(player_tags), shard_size)]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(refresh_shard, api_token, shard, rate, max_connections) for shard in shards]
+        for future in as_completed(futures):
+            rows.extend(future.result())
+            logging.info('Refreshed {} legend players so far.'.format(len(rows)))
+    return rows
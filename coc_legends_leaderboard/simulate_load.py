@@ -0,0 +1,408 @@
+'''
+Load simulator of the bot commands, without discord or the Clash of Clans API.
+
+The command handlers of ``bot.py`` are driven with fake contexts, messages and reactions at a
+configurable concurrency, against a stubbed API client and a separate database. The latency of
+every handler and the blocking of the event loop are measured, e.g.
+
+    python simulate_load.py --players 2000 --operations 2000 --concurrency 20 --api-latency 0.05
+'''
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import itertools
+import collections
+
+import bot
+from coc import NotFoundError
+from models import Player
+from legends_leaderboard import save_leaderboard
+
+
+# relative weights of the simulated operations
+DEFAULT_MIX = {
+    'rankings': 20,
+    'rankings -g': 5,
+    'rankings -r': 1,
+    'reaction': 50,
+    'reaction 🔄': 1,
+    'register': 5,
+    'remove': 2,
+    'players': 2,
+    'clans': 2,
+    'stats': 10,
+    'season-report': 2,
+}
+
+
+class StubClashOfClans:
+    '''
+    Stand-in of ``coc.ClashOfClans`` that makes up players and clans instead of requesting them.
+
+    Parameters
+    ----------
+    latency : float, optional, default to 0
+        Number of seconds every request takes.
+    seed    : int, optional, default to 0
+        The seed of the made up trophies.
+    '''
+
+    legend_league_id = 29000022
+    clan_tag = '#STUBCLAN'
+    # the responses are made up, there is nothing to cache
+    http_cache = None
+
+    def __init__(self, latency=0., seed=0):
+        self.latency = latency
+        self.api_token = None
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._trophies = {}
+
+    async def _request(self):
+        self.requests += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    async def get_player_info(self, player_tag):
+        await self._request()
+        if not player_tag.startswith('#'):
+            raise NotFoundError('Failed to obtain player information. {}'.format(player_tag))
+        trophies = self._trophies.get(player_tag, self._random.randint(4900, 6000))
+        trophies = max(4900, trophies + self._random.randint(-40, 40))
+        self._trophies[player_tag] = trophies
+        return {
+            'tag': player_tag,
+            'name': 'Player {}'.format(player_tag[1:]),
+            'trophies': trophies,
+            'attackWins': self._random.randint(0, 300),
+            'defenseWins': self._random.randint(0, 50),
+            'league': {'id': self.legend_league_id, 'name': 'Legend League'},
+            'clan': {'tag': self.clan_tag, 'name': 'Stub Clan'},
+            'legendStatistics': {'legendTrophies': 1000},
+        }
+
+    async def get_player(self, player_tag, keep_raw=True):
+        player_info = await self.get_player_info(player_tag)
+        raw = json.dumps(player_info).encode('utf-8') if keep_raw else None
+        return Player.from_dict(player_info, raw=raw)
+
+    async def get_clan_info(self, clan_tag):
+        await self._request()
+        return {'tag': clan_tag, 'name': 'Stub Clan'}
+
+    async def get_clan_members(self, clan_tag):
+        await self._request()
+        return []
+
+    async def get_location_player_rankings(self, location_id='global', limit=None):
+        await self._request()
+        ranked = sorted(self._trophies.items(), key=lambda item: -item[1])[:limit]
+        return [{'tag': tag, 'rank': rank} for rank, (tag, _) in enumerate(ranked, 1)]
+
+    async def verify_players(self, tokens):
+        await self._request()
+        return {player_tag: True for player_tag in tokens}, []
+
+
+class FakePermissions:
+
+    administrator = True
+
+
+class FakeUser:
+
+    def __init__(self, user_id, name=None, bot=False):
+        self.id = user_id
+        self.name = name or 'user{}'.format(user_id)
+        self.bot = bot
+
+
+class FakeMessage:
+
+    _ids = itertools.count(1)
+
+    def __init__(self, channel, content, author=None):
+        self.id = next(self._ids)
+        self.channel = channel
+        self.content = content
+        self.author = author
+        self.edits = 0
+
+    async def edit(self, content):
+        self.content = content
+        self.edits += 1
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def remove_reaction(self, emoji, user):
+        pass
+
+    async def delete(self):
+        pass
+
+
+class FakeChannel:
+
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+
+    def permissions_for(self, user):
+        return FakePermissions()
+
+    async def send(self, content):
+        message = FakeMessage(self, content, author=bot.bot.user)
+        self.sent.append(message)
+        return message
+
+
+class FakeCommand:
+
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeContext:
+
+    def __init__(self, author, channel, command_name):
+        self.author = author
+        self.channel = channel
+        self.command = FakeCommand(command_name)
+        self.message = FakeMessage(channel, '!' + command_name, author=author)
+
+    async def send(self, content):
+        return await self.channel.send(content)
+
+
+class FakeReaction:
+
+    def __init__(self, message, emoji):
+        self.message = message
+        self.emoji = emoji
+
+
+class LoopLagMonitor:
+    '''
+    Measure how long the event loop is blocked, from how late a periodic sleep wakes up.
+
+    Parameters
+    ----------
+    interval : float, optional, default to 0.01
+        Number of seconds between the checks.
+    '''
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(time.perf_counter() - start - self.interval, 0.))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def blocked(self, threshold=0.05):
+        ''' Total number of seconds of the lags longer than ``threshold``.
+        '''
+        return sum(lag for lag in self.lags if lag > threshold)
+
+
+def percentile(values, q):
+    ''' The ``q``-th percentile of the values, with the nearest rank method.
+    '''
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    index = max(int(round(q / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+class LoadSimulator:
+    '''
+    Drive the command handlers of the bot with fake discord objects.
+
+    Parameters
+    ----------
+    players     : int, optional, default to 500
+        The number of registered players.
+    concurrency : int, optional, default to 10
+        The number of simulated users sending commands at the same time.
+    channels    : int, optional, default to 5
+        The number of channels the commands are sent in.
+    api_latency : float, optional, default to 0
+        Number of seconds every stubbed API request takes.
+    mix         : dict(str, int), optional, default to ``DEFAULT_MIX``
+        The relative weights of the simulated operations.
+    dbname      : str, optional, default to 'loadtest.db'
+        The database of the simulation, relative to the package directory. It is overwritten.
+    seed        : int, optional, default to 0
+        The random seed.
+    '''
+
+    def __init__(self, players=500, concurrency=10, channels=5, api_latency=0., mix=None,
+                 dbname='loadtest.db', seed=0):
+        self.players = players
+        self.concurrency = concurrency
+        self.channels = [FakeChannel(channel_id) for channel_id in range(1, channels + 1)]
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.dbname = dbname
+        self.random = random.Random(seed)
+        self.coc = StubClashOfClans(latency=api_latency, seed=seed)
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self.monitor = LoopLagMonitor()
+        self._new_tags = itertools.count(1)
+
+    async def setup(self):
+        ''' Point the bot at the stub client and a fresh database filled with the roster.
+        '''
+        path = os.path.join(bot.PATH, self.dbname)
+        if os.path.exists(path):
+            os.remove(path)
+        lll = bot.lll
+        lll.coc = self.coc
+        lll.dbname = self.dbname
+        lll.refresh_workers = 0
+        lll.player_snapshots = None
+        bot.stats_cache.dbname = self.dbname
+        bot.stats_cache.invalidate()
+        lll.player_tags = ['#P{}'.format(index) for index in range(self.players)]
+        lll.qualified_clans = []
+        lll.linked_accounts = {}
+        lll.save_player_tags()
+        lll.save_qualified_clans()
+        save_leaderboard(self.dbname, await lll.get_current_season_trophies(), lll.current_season)
+        bot.current_leaderboard = None
+        bot.live_messages.clear()
+        bot.page_cache.clear()
+        await bot.warm_up()
+        bot.update_queue.start()
+
+    async def _command(self, name, *args):
+        channel = self.random.choice(self.channels)
+        user = FakeUser(self.random.randint(1, 1000))
+        ctx = FakeContext(user, channel, name)
+        command = getattr(bot, name.replace('-', '_'))
+        # the hooks of the bot are run as ``bot.invoke`` would, for the tracing and profiling
+        await bot.before_command(ctx)
+        try:
+            await command.callback(ctx, *args)
+        finally:
+            await bot.after_command(ctx)
+
+    async def _reaction(self, refresh=False):
+        sent = [message for channel in self.channels for message in channel.sent]
+        if not sent:
+            return await self._command('rankings')
+        message = self.random.choice(sent)
+        emoji = '🔄' if refresh else self.random.choice('⏮ ⏪ ⏩ ⏭'.split())
+        await bot.on_reaction_add(FakeReaction(message, emoji), FakeUser(self.random.randint(1, 1000)))
+
+    def _operation(self, name):
+        if name == 'reaction':
+            return self._reaction()
+        elif name == 'reaction 🔄':
+            return self._reaction(refresh=True)
+        elif name == 'register':
+            return self._command('register', '#NEW{}'.format(next(self._new_tags)))
+        elif name == 'remove':
+            return self._command('remove', self.random.choice(bot.lll.player_tags or ['#NONE']))
+        elif name == 'stats':
+            return self._command('stats', self.random.choice(bot.lll.player_tags or ['#NONE']))
+        command, *args = name.split()
+        return self._command(command, *args)
+
+    async def _worker(self, operations):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while next(operations, None) is not None:
+            name = self.random.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                await self._operation(name)
+            except Exception as error:
+                logging.debug('Operation {} failed: {}'.format(name, error))
+                self.errors[name] += 1
+            self.latencies[name].append(time.perf_counter() - start)
+
+    async def run(self, operations=1000):
+        ''' Run the operations with the simulated users.
+
+        Returns
+        -------
+        elapsed : float
+            Number of seconds the operations took.
+        '''
+        await self.setup()
+        counter = iter(range(operations))
+        self.monitor.start()
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*[self._worker(counter) for _ in range(self.concurrency)])
+            await bot.update_queue.flush()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.monitor.stop()
+            bot.update_queue.stop()
+        return elapsed
+
+    def report(self, elapsed):
+        ''' Format the latencies of the handlers and the blocking of the event loop.
+        '''
+        lines = ['{:<16} {:>6} {:>6} {:>10} {:>10} {:>10}'.format(
+            'operation', 'count', 'errors', 'p50 (ms)', 'p99 (ms)', 'max (ms)')]
+        for name in sorted(self.latencies):
+            latencies = self.latencies[name]
+            lines.append('{:<16} {:>6} {:>6} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+                name, len(latencies), self.errors[name],
+                percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+                max(latencies) * 1000))
+        lags = self.monitor.lags
+        lines.append('')
+        lines.append('{} operations in {:.2f}s, {} API requests.'.format(
+            sum(map(len, self.latencies.values())), elapsed, self.coc.requests))
+        lines.append('Event loop lag: p50 {:.1f}ms, p99 {:.1f}ms, max {:.1f}ms, blocked {:.2f}s.'.format(
+            percentile(lags, 50) * 1000, percentile(lags, 99) * 1000,
+            max(lags, default=0.) * 1000, self.monitor.blocked()))
+        return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate load on the bot command handlers.')
+    parser.add_argument('--players', type=int, default=500, help='number of registered players')
+    parser.add_argument('--operations', type=int, default=1000, help='number of operations')
+    parser.add_argument('--concurrency', type=int, default=10, help='number of simultaneous users')
+    parser.add_argument('--channels', type=int, default=5, help='number of channels')
+    parser.add_argument('--api-latency', type=float, default=0., help='seconds per stubbed API request')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    simulator = LoadSimulator(
+        players=args.players,
+        concurrency=args.concurrency,
+        channels=args.channels,
+        api_latency=args.api_latency,
+        seed=args.seed,
+    )
+    elapsed = asyncio.get_event_loop().run_until_complete(simulator.run(args.operations))
+    print(simulator.report(elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import os
+import pickle
+import logging
+
+
+logging.basicConfig(level=logging.INFO)
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def snapshot_path(dbname):
+    ''' Path of the leaderboard snapshot of a database, e.g. ``database.snapshot``.
+    '''
+    return os.path.join(PATH, os.path.splitext(dbname)[0] + '.snapshot')
+
+
+def save_snapshot(dbname, data, season):
+    ''' Save the leaderboard into a binary snapshot next to the database.
+
+    The snapshot is written to a temporary file first and then moved into place, so a crash
+    never leaves a partial snapshot behind.
+
+    Parameters
+    ----------
+    dbname : str
+        The database file name.
+    data   : pandas.DataFrame
+        A Pandas DataFrame of the leaderboard.
+    season : str
+        The season of the leaderboard.
+    '''
+    path = snapshot_path(dbname)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'season': season, 'data': data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def remove_snapshot(dbname):
+    ''' Remove the snapshot of a database, so the database is loaded instead.
+    '''
+    path = snapshot_path(dbname)
+    for stale_path in (path, path + '.tmp'):
+        try:
+            os.remove(stale_path)
+        except FileNotFoundError:
+            pass
+        except OSError as error:
+            logging.warning('Failed to remove leaderboard snapshot {}: {}'.format(stale_path, error))
+
+
+def load_snapshot(dbname):
+    ''' Load the leaderboard from the binary snapshot.
+
+    Parameters
+    ----------
+    dbname : str
+        The database file name.
+
+    Returns
+    -------
+    snapshot : tuple(pandas.DataFrame, str) or None
+        The leaderboard and its season, None if the snapshot is missing or corrupt.
+    '''
+    path = snapshot_path(dbname)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+        return snapshot['data'], snapshot['season']
+    except Exception as error:
+        logging.warning('Failed to load leaderboard snapshot {}: {}'.format(path, error))
+        return None
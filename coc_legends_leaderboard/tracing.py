@@ -0,0 +1,187 @@
+import os
+import time
+import pstats
+import inspect
+import cProfile
+import logging
+import datetime
+import functools
+import contextlib
+import contextvars
+
+
+logging.basicConfig(level=logging.INFO)
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+# root spans slower than this number of seconds are logged
+slow_threshold = 2.0
+
+
+class Span:
+    '''
+    A timed section of work, nested under the span that was active when it started.
+
+    Parameters
+    ----------
+    name   : str
+        The name of the span.
+    parent : Span or None
+        The parent span.
+    '''
+
+    __slots__ = ('name', 'parent', 'children', 'start', 'duration')
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = []
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def format(self, indent=0):
+        ''' Format the span and its children into an indented tree.
+        '''
+        duration = '...' if self.duration is None else '{:.1f}ms'.format(self.duration * 1000)
+        lines = ['{}{} {}'.format('  ' * indent, self.name, duration)]
+        for child in self.children:
+            lines.append(child.format(indent + 1))
+        return '\n'.join(lines)
+
+
+def start_span(name):
+    ''' Start a span under the current span.
+
+    Returns
+    -------
+    token : tuple
+        Pass to ``end_span`` to end the span.
+    '''
+    parent = _current_span.get()
+    current = Span(name, parent)
+    if parent is not None:
+        parent.children.append(current)
+    return current, _current_span.set(current)
+
+
+def end_span(token):
+    ''' End a span started by ``start_span``.
+
+    Root spans that took longer than ``slow_threshold`` are logged with their children.
+
+    Returns
+    -------
+    span : Span
+        The ended span.
+    '''
+    current, context_token = token
+    current.duration = time.perf_counter() - current.start
+    _current_span.reset(context_token)
+    if current.parent is None and current.duration > slow_threshold:
+        logging.warning('Slow trace:\n{}'.format(current.format()))
+    return current
+
+
+@contextlib.contextmanager
+def span(name):
+    ''' Time the enclosed block as a span.
+    '''
+    token = start_span(name)
+    try:
+        yield token[0]
+    finally:
+        end_span(token)
+
+
+def traced(name=None):
+    ''' Decorator that times every call of a function, or coroutine function, as a span.
+
+    Parameters
+    ----------
+    name : str, optional, default to None
+        The name of the span. If None, the qualified name of the function.
+    '''
+    def decorator(function):
+        span_name = name or function.__qualname__
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await function(*args, **kwargs)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with span(span_name):
+                    return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class CommandProfiler:
+    '''
+    Profile the next commands with cProfile and dump the results into files.
+
+    Only one command is profiled at a time, commands that start while another one is being
+    profiled are not profiled and do not count.
+
+    Parameters
+    ----------
+    directory : str, optional, default to 'profiles'
+        The directory of the dumped profiles, relative to the package directory.
+    '''
+
+    def __init__(self, directory='profiles'):
+        self.directory = os.path.join(PATH, directory)
+        self.remaining = 0
+        self._profile = None
+        self._owner = None
+
+    def arm(self, count):
+        ''' Profile the next ``count`` commands.
+        '''
+        self.remaining = count
+
+    def start(self, owner):
+        ''' Start profiling if armed and not busy.
+
+        Parameters
+        ----------
+        owner : object
+            The object identifying the profiled command, passed to ``stop``.
+        '''
+        if self.remaining <= 0 or self._profile is not None:
+            return
+        self.remaining -= 1
+        self._owner = owner
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self, owner, name):
+        ''' Stop profiling and dump the results.
+
+        Parameters
+        ----------
+        owner : object
+            The object passed to ``start``.
+        name  : str
+            The name of the profiled command, used in the file names.
+
+        Returns
+        -------
+        path : str or None
+            The path of the dumped profile, None if the command was not profiled.
+        '''
+        if self._profile is None or self._owner is not owner:
+            return None
+        self._profile.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, '{}-{}.prof'.format(
+            name, datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')))
+        self._profile.dump_stats(path)
+        with open(os.path.splitext(path)[0] + '.txt', 'w') as f:
+            pstats.Stats(self._profile, stream=f).sort_stats('cumulative').print_stats(50)
+        self._profile = None
+        self._owner = None
+        logging.info('Dumped profile of {} into {}.'.format(name, path))
+        return path
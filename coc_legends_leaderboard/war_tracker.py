@@ -0,0 +1,135 @@
+import asyncio
+import logging
+
+from coc import format_war_attack, get_war_attacks, get_war_player_names
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+class WarUpdate:
+    '''
+    New activity of a war since the last poll.
+
+    Parameters
+    ----------
+    clan_tag    : str
+        The tag of the tracked clan.
+    war_info    : dict
+        The war info, see ``ClashOfClans.get_current_war_info``.
+    attacks     : list of tuple(dict, bool)
+        The new attacks, see ``coc.get_war_attacks``.
+    state_changed : bool
+        Whether the war state changed since the last poll.
+    '''
+
+    __slots__ = ('clan_tag', 'war_info', 'attacks', 'state_changed')
+
+    def __init__(self, clan_tag, war_info, attacks, state_changed):
+        self.clan_tag = clan_tag
+        self.war_info = war_info
+        self.attacks = attacks
+        self.state_changed = state_changed
+
+    def format(self):
+        ''' Format the update into a compact text for discord post.
+        '''
+        clan = self.war_info['clan']
+        opponent = self.war_info['opponent']
+        header = '{} {}⭐ {:.2f}% v {:.2f}% {}⭐ {}'.format(
+            clan['name'], clan['stars'], clan['destructionPercentage'],
+            opponent['destructionPercentage'], opponent['stars'], opponent['name'])
+        content = [header]
+        if self.state_changed:
+            content.append({
+                'preparation': 'Preparation day started.',
+                'inWar': 'Battle day started.',
+                'warEnded': 'War ended.',
+            }.get(self.war_info['state'], self.war_info['state']))
+        player_names = get_war_player_names(self.war_info)
+        content.extend(format_war_attack(attack, outgoing, player_names)
+                       for attack, outgoing in self.attacks)
+        return '```\n{}\n```'.format('\n'.join(content))
+
+
+class WarTracker:
+    '''
+    Track the current wars of several clans and report only the new attacks.
+
+    The last seen attack ``order`` of each war is remembered, so every poll only processes and
+    reports the attacks that happened since the previous poll.
+
+    Parameters
+    ----------
+    coc               : coc.ClashOfClans
+        The API wrapper.
+    announce_existing : bool, optional, default to False
+        Whether to report the attacks that already happened when a war is seen for the first
+        time, e.g. after a restart.
+    '''
+
+    def __init__(self, coc, announce_existing=False):
+        self.coc = coc
+        self.announce_existing = announce_existing
+        # clan tag -> (war key, last seen attack order, war state)
+        self._wars = {}
+
+    @staticmethod
+    def _war_key(war_info):
+        return (war_info['opponent'].get('tag'), war_info.get('preparationStartTime'))
+
+    def _process(self, clan_tag, war_info):
+        if war_info.get('state', 'notInWar') == 'notInWar':
+            self._wars.pop(clan_tag, None)
+            return None
+        key = self._war_key(war_info)
+        previous = self._wars.get(clan_tag)
+        if previous is None or previous[0] != key:
+            # a new war
+            last_order = 0
+            state = None
+            if previous is None and not self.announce_existing:
+                attacks = get_war_attacks(war_info)
+                last_order = attacks[-1][0]['order'] if attacks else 0
+                state = war_info['state']
+        else:
+            _, last_order, state = previous
+
+        attacks = get_war_attacks(war_info, after_order=last_order)
+        if attacks:
+            last_order = attacks[-1][0]['order']
+        state_changed = state != war_info['state']
+        self._wars[clan_tag] = (key, last_order, war_info['state'])
+        if attacks or state_changed:
+            return WarUpdate(clan_tag, war_info, attacks, state_changed)
+        return None
+
+    async def poll(self, clan_tags):
+        ''' Poll the current wars of the clans concurrently.
+
+        Parameters
+        ----------
+        clan_tags : list of str
+            Tags of the clans to track.
+
+        Returns
+        -------
+        updates : list of WarUpdate
+            The wars with new attacks or a new state.
+        '''
+        for clan_tag in list(self._wars):
+            if clan_tag not in clan_tags:
+                del self._wars[clan_tag]
+        war_infos = await asyncio.gather(
+            *[self.coc.get_current_war_info(clan_tag) for clan_tag in clan_tags],
+            return_exceptions=True)
+        updates = []
+        for clan_tag, war_info in zip(clan_tags, war_infos):
+            if isinstance(war_info, Exception):
+                # e.g. the war log of the clan is private
+                logging.warning('Failed to poll current war of clan {}: {}'.format(clan_tag, war_info))
+                continue
+            update = self._process(clan_tag, war_info)
+            if update is not None:
+                updates.append(update)
+        return updates
@@ -0,0 +1,71 @@
+import random
+
+from rank_diff import RankTracker
+
+
+def test_passive_player_moves_down():
+    tracker = RankTracker()
+    tracker.reset({'#A': 5000, '#B': 5100, '#C': 5200})
+    changes = tracker.update({'#A': 5150})
+    assert changes.moves['#A'] == (3, 2)
+    assert changes.moves['#B'] == (2, 3)
+    assert changes.format_movement('#B') == '▼1'
+    assert changes.format_movement('#C') == ''
+    assert changes.passes == [('#A', '#B')]
+
+
+def test_passive_player_moves_up():
+    tracker = RankTracker()
+    tracker.reset({'#A': 5000, '#B': 5100, '#C': 5200})
+    changes = tracker.update({'#C': 5050})
+    assert changes.format_movement('#B') == '▲1'
+    assert changes.format_movement('#C') == '▼1'
+    assert '#A' not in changes.moves
+
+
+def test_moves_match_full_ranking():
+    rng = random.Random(0)
+    trophies = {'#P{}'.format(index): rng.randint(4900, 5300) for index in range(200)}
+    tracker = RankTracker()
+    tracker.reset(trophies)
+
+    def ranks(values):
+        return {tag: 1 + sum(other > value for other in values.values()) for tag, value in values.items()}
+
+    new_tags = ('#N{}'.format(index) for index in range(1000))
+    for _ in range(40):
+        before = ranks(trophies)
+        changed = {tag: max(4900, trophies[tag] + rng.randint(-60, 60)) for tag in rng.sample(list(trophies), 10)}
+        removed = rng.sample([tag for tag in trophies if tag not in changed], rng.randint(0, 2))
+        changed.update({next(new_tags): rng.randint(4900, 5300) for _ in range(rng.randint(0, 2))})
+        trophies.update(changed)
+        for tag in removed:
+            del trophies[tag]
+        after = ranks(trophies)
+        changes = tracker.update(changed, removed=removed)
+        for tag in trophies:
+            if before.get(tag) != after[tag]:
+                assert changes.moves[tag] == (before.get(tag), after[tag])
+        for tag in removed:
+            assert changes.moves[tag] == (before[tag], None)
+
+
+def test_new_and_removed_players_shift_the_ranks_below():
+    tracker = RankTracker()
+    tracker.reset({'#A': 5000, '#B': 5100})
+    changes = tracker.update({'#N': 5200})
+    assert changes.moves['#N'] == (None, 1)
+    assert changes.format_movement('#A') == '▼1'
+    assert changes.format_movement('#B') == '▼1'
+    changes = tracker.update({}, removed=['#N'])
+    assert changes.moves['#N'] == (1, None)
+    assert changes.format_movement('#A') == '▲1'
+    assert changes.format_movement('#B') == '▲1'
+
+
+def test_crossed_range_is_not_walked_value_by_value():
+    tracker = RankTracker(max_trophies=10 ** 7)
+    tracker.reset({'#A': 0, '#B': 5 * 10 ** 6})
+    changes = tracker.update({'#A': 10 ** 7})
+    assert changes.passes == [('#A', '#B')]
+    assert changes.format_movement('#B') == '▼1'
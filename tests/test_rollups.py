@@ -0,0 +1,87 @@
+import random
+import sqlite3 as sql
+
+import pandas as pd
+import pytest
+
+import rollups
+from analytics import compute_player_stats, load_history
+from legends_leaderboard import _append_history
+
+
+SEASON = '2026-10'
+
+
+@pytest.fixture
+def dbname(tmp_path):
+    # an absolute path is kept as is by the modules
+    return str(tmp_path / 'history.db')
+
+
+def _fill_history(dbname, start, hours, players=5, seed=0):
+    rng = random.Random(seed)
+    trophies = {'#P{}'.format(index): 5000 + 10 * index for index in range(players)}
+    rows = []
+    for step in range(hours * 4):
+        timestamp = start + pd.Timedelta(minutes=15 * step)
+        for player_tag in trophies:
+            if rng.random() < 0.5:
+                trophies[player_tag] = max(4900, trophies[player_tag] + rng.choice([-40, -16, 8, 24, 40]))
+            rows.append((player_tag, 'Player ' + player_tag, trophies[player_tag], step, 0, timestamp))
+    data = pd.DataFrame(rows, columns=['player_tag', 'name', 'trophies', 'attack_wins', 'defense_wins',
+                                       'timestamp'])
+    with sql.connect(dbname) as con:
+        _append_history(con, data, SEASON)
+
+
+def test_stats_identical_after_compaction(dbname):
+    start = pd.Timestamp('2026-10-05 07:00:00')
+    _fill_history(dbname, start, hours=24 * 10)
+    before = compute_player_stats(load_history(dbname, SEASON), remaining_days=5)
+
+    now = start + pd.Timedelta(days=10)
+    compacted = rollups.compact_history(dbname, now=now, hourly_retention=pd.Timedelta(days=3),
+                                        archive=False)
+    assert compacted['raw'] > 0 and compacted['hourly'] > 0
+    after = compute_player_stats(load_history(dbname, SEASON), remaining_days=5)
+    pd.testing.assert_frame_equal(before, after, check_dtype=False)
+
+    # compacting again in between keeps the boundaries exact
+    rollups.compact_history(dbname, now=now + pd.Timedelta(hours=30), hourly_retention=pd.Timedelta(days=3),
+                            archive=False)
+    again = compute_player_stats(load_history(dbname, SEASON), remaining_days=5)
+    pd.testing.assert_frame_equal(before, again, check_dtype=False)
+
+
+def test_load_series_counts_every_period_once(dbname):
+    start = pd.Timestamp('2026-10-05 05:00:00')
+    _fill_history(dbname, start, hours=24 * 4, players=2)
+    raw = rollups.load_series(dbname, SEASON, resolution='day')
+    rollups.compact_history(dbname, now=start + pd.Timedelta(days=4), hourly_retention=pd.Timedelta(days=2),
+                            archive=False)
+    compacted = rollups.load_series(dbname, SEASON, resolution='day')
+    pd.testing.assert_frame_equal(raw, compacted, check_dtype=False)
+
+
+def test_load_series_window_across_tiers(dbname):
+    start = pd.Timestamp('2026-10-05 05:00:00')
+    _fill_history(dbname, start, hours=24 * 4 + 2, players=3)
+    window = dict(start=start + pd.Timedelta(days=1), end=start + pd.Timedelta(days=4, hours=1))
+    columns = ['player_tag', 'bucket', 'open', 'close', 'low', 'high', 'samples']
+    raw = rollups.load_series(dbname, SEASON, resolution='day', **window)[columns]
+
+    # daily bars for the first two days, hourly bars for the next two and raw snapshots after
+    rolled_up = rollups.compact_history(dbname, now=start + pd.Timedelta(days=4, hours=2),
+                                        hourly_retention=pd.Timedelta(days=2), archive=False)
+    assert rolled_up['raw'] > 0 and rolled_up['hourly'] > 0
+    compacted = rollups.load_series(dbname, SEASON, resolution='day', **window)[columns]
+    pd.testing.assert_frame_equal(raw, compacted, check_dtype=False)
+    assert compacted['bucket'].min() == window['start']
+    assert compacted['bucket'].nunique() == 4
+
+
+def test_latest_board_keeps_the_roster_only(dbname):
+    start = pd.Timestamp('2026-10-05 05:00:00')
+    _fill_history(dbname, start, hours=2, players=3)
+    board = rollups.load_latest_board(dbname, SEASON, player_tags=['#P0', '#P2'])
+    assert sorted(board['player_tag']) == ['#P0', '#P2']
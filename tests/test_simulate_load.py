@@ -0,0 +1,16 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('discord')
+
+from simulate_load import LoadSimulator
+
+
+def test_simulated_operations_run(tmp_path):
+    simulator = LoadSimulator(players=20, concurrency=4, channels=2, dbname=str(tmp_path / 'loadtest.db'))
+    elapsed = asyncio.get_event_loop().run_until_complete(simulator.run(operations=40))
+    assert elapsed > 0
+    assert sum(map(len, simulator.latencies.values())) == 40
+    assert not simulator.errors
+    assert 'Event loop lag' in simulator.report(elapsed)